@@ -0,0 +1,50 @@
+import numpy as np
+
+# Números aleatorios reproducibles. Todas las decisiones aleatorias de los
+# scripts y de los motores pasan por un numpy.random.Generator explícito en
+# lugar de los generadores globales de random y np.random.
+#
+# Esquema de semillas: una corrida con semilla s usa SeedSequence(s). Cuando
+# el trabajo se reparte, cada parte i recibe el generador hijo de índice i de
+# esa SeedSequence (child_generator / child_generators): las condiciones
+# iniciales de las réplicas de conjunto.py, los puntos de barrido.py (con un
+# índice que sale de sus parámetros) y las franjas de paralelo.py. Los hijos
+# son independientes entre sí y dependen sólo de (s, i), no de qué proceso o
+# hilo los use, así que el resultado es el mismo en serie o con N trabajadores.
+
+# Generador de la corrida actual; los motores lo usan cuando no reciben rng
+rng = np.random.default_rng()
+
+
+# Función para convertir una semilla (None, entero o SeedSequence) en SeedSequence
+def seed_sequence(seed=None):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+# Función para crear un generador a partir de una semilla
+def make_generator(seed=None):
+    return np.random.default_rng(seed_sequence(seed))
+
+
+# Función para reiniciar el generador de la corrida (None usa entropía del sistema)
+def seed(value=None):
+    global rng
+    rng = make_generator(value)
+    return rng
+
+
+# Función con el generador hijo de índice index; equivale al elemento index
+# de child_generators(seed, n) para cualquier n > index
+def child_generator(seed, index):
+    parent = seed_sequence(seed)
+    child = np.random.SeedSequence(parent.entropy, spawn_key=parent.spawn_key + (index,),
+                                   pool_size=parent.pool_size)
+    return np.random.default_rng(child)
+
+
+# Función con n generadores hijos independientes
+def child_generators(seed, n):
+    parent = seed_sequence(seed)
+    return [child_generator(parent, index) for index in range(n)]
@@ -0,0 +1,221 @@
+import argparse
+import ast
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import aleatorio
+import checkpoint
+import compilado
+import ejecucion
+
+# Barrido de parámetros: corre un script en modo headless para cada
+# combinación de valores de sus constantes de módulo (ADD_DROPLET_PROB,
+# SPLIT_THRESHOLD, MEDIUM_THRESHOLD, ...), repartiendo las corridas entre
+# procesos y guardando el resumen de cada una en disco. Al repetir un barrido
+# sólo se calculan los puntos que faltan en la caché.
+
+CACHE_DIR = ".cache_barrido"  # Carpeta por defecto para la caché de resultados
+CACHE_VERSION = 4  # Cambia cuando los resultados de una misma semilla cambian
+
+
+# Función para calcular la clave de caché de una corrida; backend es el que
+# se usa de verdad ("numpy" o "numba"), porque sortean distinto
+def cache_key(script, params, seed, steps, backend="numpy"):
+    description = json.dumps(
+        {"script": script, "params": params, "seed": seed, "steps": steps, "backend": backend,
+         "version": CACHE_VERSION},
+        sort_keys=True,
+    )
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+# Función con el índice del generador hijo de un punto del barrido. Sale de
+# los valores de los parámetros y no de su posición en la rejilla, así que
+# agregar valores a un barrido no cambia los resultados ya guardados
+def point_index(params):
+    description = json.dumps(params, sort_keys=True)
+    return int.from_bytes(hashlib.sha256(description.encode()).digest()[:4], "little")
+
+
+# Función para resumir las series escalares de una corrida: valor final y
+# promedio sobre la segunda mitad de los pasos (las series vienen decimadas
+# con un intervalo uniforme, así que la mitad de las muestras es la mitad de
+# los pasos)
+def summarize(series):
+    summary = {}
+    for name, values in series.items():
+        if name == "time_steps" or not isinstance(values, list) or not values:
+            continue
+        if not np.isscalar(values[-1]):
+            continue
+        values = np.asarray(values, dtype=float)
+        summary[f"{name}_final"] = float(values[-1])
+        summary[f"{name}_second_half_mean"] = float(values[len(values) // 2:].mean())
+    # Con STEADY_STATE_TOLERANCE: paso de equilibrio y estimaciones del estado estacionario
+    steady_state = series.get("steady_state")
+    if steady_state is not None and steady_state["converged"]:
+        summary["equilibration_step"] = steady_state["equilibration_step"]
+        for name, estimate in steady_state["estimates"].items():
+            summary[f"{name}_steady_mean"] = estimate["mean"]
+            summary[f"{name}_steady_ci"] = estimate["ci"]
+    return summary
+
+
+# Función que ejecuta una corrida en un proceso trabajador.
+# Los parámetros se aplican como constantes del módulo y se restauran al
+# terminar, porque el mismo proceso se reutiliza para otros puntos. El
+# generador de la corrida es el hijo point_index(params) de la semilla (ver
+# aleatorio.py): cada punto usa su propio flujo de números y el resultado no
+# depende del proceso ni del orden en que se corra. backend se aplica como
+# compilado.BACKEND mientras dura la corrida.
+def run_point(script, params, seed, steps, backend="numpy"):
+    module = importlib.import_module(script)
+    previous = {}
+    for name, value in params.items():
+        if not hasattr(module, name):
+            raise ValueError(f"{script} no tiene el parámetro {name}")
+        previous[name] = getattr(module, name)
+        setattr(module, name, value)
+
+    aleatorio.rng = aleatorio.child_generator(seed, point_index(params))
+    previous_backend, compilado.BACKEND = compilado.BACKEND, backend
+    try:
+        start = time.perf_counter()
+        series = ejecucion.run_model(module, steps)
+        wall_time = time.perf_counter() - start
+        # Menos que steps si la corrida se detuvo en el estado estacionario
+        steps_run = series["statistics"]["steps"]
+    finally:
+        compilado.BACKEND = previous_backend
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+    return {
+        "script": script,
+        "params": params,
+        "seed": seed,
+        "steps": steps,
+        "backend": backend,
+        "summary": summarize(series),
+        "steps_run": steps_run,
+        "wall_time": wall_time,
+        "steps_per_second": steps_run / wall_time if wall_time > 0 else float("inf"),
+        "worker": os.getpid(),
+    }
+
+
+# Función para leer un resultado de la caché; un archivo ilegible (por
+# ejemplo de una versión anterior que lo escribía en su lugar y se cortó a la
+# mitad) cuenta como ausente y se vuelve a calcular
+def load_cached(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Función para generar todas las combinaciones de una rejilla de parámetros
+def parameter_points(param_grid):
+    names = sorted(param_grid)
+    for values in itertools.product(*(param_grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+# Función para correr un barrido completo.
+# param_grid es un diccionario {parámetro: [valores]}; se corre cada
+# combinación con cada semilla. Con workers=1 las corridas se hacen en este
+# mismo proceso, una tras otra, con resultados idénticos a los del modo en
+# paralelo. backend elige los núcleos como compilado.BACKEND ("auto" se
+# resuelve aquí, así que la caché distingue las corridas de NumPy y de Numba).
+# Devuelve la lista de resultados (de la caché o recién calculados) y las
+# estadísticas por trabajador de esta ejecución.
+def run_sweep(script, param_grid, seeds, steps, workers=None, cache_dir=CACHE_DIR, backend="numpy"):
+    backend = compilado.resolve(backend)
+    os.makedirs(cache_dir, exist_ok=True)
+    results = []
+    pending = []
+    for params in parameter_points(param_grid):
+        for seed in seeds:
+            path = os.path.join(cache_dir, cache_key(script, params, seed, steps, backend) + ".json")
+            cached = load_cached(path)
+            if cached is not None:
+                results.append(cached)
+            else:
+                pending.append((path, params, seed))
+
+    worker_stats = {}
+
+    def store(path, result):
+        checkpoint.atomic_write(path, lambda f: json.dump(result, f), "w")
+        results.append(result)
+        stats = worker_stats.setdefault(result["worker"], {"runs": 0, "wall_time": 0.0, "steps": 0})
+        stats["runs"] += 1
+        stats["wall_time"] += result["wall_time"]
+        stats["steps"] += result["steps_run"]
+
+    if pending and workers == 1:
+        for path, params, seed in pending:
+            store(path, run_point(script, params, seed, steps, backend))
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(run_point, script, params, seed, steps, backend): path
+                for path, params, seed in pending
+            }
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+
+    return results, worker_stats
+
+
+# Función para leer un parámetro de la forma NOMBRE=v1,v2,v3
+def parse_param(text):
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"se esperaba NOMBRE=v1,v2,... y se recibió {text!r}")
+    return name, [ast.literal_eval(value) for value in values.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros con caché en disco")
+    parser.add_argument("script", help="Módulo a barrer, por ejemplo proyecto2")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help="Parámetro y valores, por ejemplo ADD_DROPLET_PROB=0.01,0.05")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Número de procesos (por defecto todos los núcleos)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--backend", choices=compilado.BACKENDS, default=compilado.BACKEND,
+                        help="Núcleos de los bucles por celda: numpy, numba o auto (numba si está instalado)")
+    parser.add_argument("--output", default=None, help="Archivo JSON con todos los resultados")
+    parser.add_argument("--steady-tolerance", type=float, default=None,
+                        help="Terminar cada corrida en el estado estacionario (STEADY_STATE_TOLERANCE)")
+    args = parser.parse_args()
+    param_grid = dict(args.param)
+    if args.steady_tolerance is not None:
+        param_grid["STEADY_STATE_TOLERANCE"] = [args.steady_tolerance]
+
+    start = time.perf_counter()
+    results, worker_stats = run_sweep(
+        args.script, param_grid, args.seeds, args.steps, args.workers, args.cache_dir, args.backend
+    )
+    elapsed = time.perf_counter() - start
+
+    computed = sum(stats["runs"] for stats in worker_stats.values())
+    print(f"{len(results)} corridas ({computed} calculadas, {len(results) - computed} de la caché) en {elapsed:.2f} s")
+    for worker, stats in sorted(worker_stats.items()):
+        print(f"  trabajador {worker}: {stats['runs']} corridas, {stats['wall_time']:.2f} s, "
+              f"{stats['steps'] / stats['wall_time']:.0f} pasos/s")
+    if args.output:
+        ejecucion.save_results(args.output, {"results": results})
@@ -0,0 +1,296 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+# Sin pantalla: pygame usa el controlador de video "dummy" y se dibuja sobre
+# una superficie fuera de pantalla
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+
+import aleatorio
+import compilado
+import conjunto
+import ejecucion
+import estadisticas
+import motor
+import proyecto2
+
+# Banco de pruebas de rendimiento de todos los modelos. Para cada script,
+# tamaño de cuadrícula y ocupación mide initialize_grid, un paso completo y
+# cada regla (motor.py) o función de actualización por separado, la
+# recolección de datos (directa y con el recolector de estadisticas.py) y
+# draw_grid. Reporta
+# pasos por segundo, nanosegundos por celda y memoria máxima, y guarda los
+# resultados en JSON para comparar versiones con --compare. --python-engine
+# mide los bucles originales, que sólo existen en proyecto5
+# (USE_NUMPY_ENGINE); en los demás scripts únicamente cambia el dibujo
+# (FAST_RENDER). El caso "conjunto" mide un paso de conjunto.py (todas las
+# réplicas de proyecto2 a la vez) y cada una de sus reglas; --backend elige
+# los núcleos de compilado.py para todos los casos.
+
+SCRIPTS = [
+    "proyecto1", "proyecto2", "proyecto3", "proyecto4",
+    "proyecto4_v2", "proyecto4Alex", "proyecto5",
+]
+GRID_SIZES = [20, 100, 400]  # Tamaños por defecto
+OCCUPANCIES = [0.1, 0.3]  # Fracción de celdas ocupadas al inicio
+UPDATE_FUNCTIONS = ["update_grid"]  # Funciones de actualización de proyecto5
+MIN_TIME = 0.2  # Segundos mínimos de medición por fase
+MAX_SURFACE_SIZE = 800  # Lado máximo en píxeles de la superficie fuera de pantalla
+REGRESSION_THRESHOLD = 1.2  # --compare marca las fases que tardan 20% más
+ENSEMBLE_REPLICAS = [1000]  # Réplicas del caso "conjunto" (con GRID_SIZE de proyecto2)
+ENSEMBLE_WARMUP_STEPS = 50  # Pasos antes de medir, para llegar a la ocupación del estado estacionario
+
+
+# Función para medir cuánto tarda fn(*make_args()). Los argumentos se
+# preparan fuera de la medición (por ejemplo una copia de la cuadrícula para
+# las funciones que la modifican). Devuelve el mejor y el promedio en segundos.
+def time_call(fn, make_args, min_time=MIN_TIME, min_repeats=3):
+    times = []
+    total = 0.0
+    while total < min_time or len(times) < min_repeats:
+        args = make_args()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    return min(times), total / len(times)
+
+
+# Función para medir la memoria máxima asignada por Python y NumPy en una llamada
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Función para crear una cuadrícula de proyecto5 con la ocupación pedida
+def random_cloud_grid(grid_size, occupancy, rng):
+    grid = np.zeros((grid_size, grid_size), dtype=[("humidity", bool), ("cloud", bool), ("act", bool)])
+    for field in ("humidity", "cloud", "act"):
+        grid[field] = rng.random((grid_size, grid_size)) < occupancy
+    return grid
+
+
+# Función que aplica a un módulo las constantes que define y devuelve los
+# valores anteriores
+def apply_constants(module, constants):
+    previous = {}
+    for name, value in constants.items():
+        if hasattr(module, name):
+            previous[name] = getattr(module, name)
+            setattr(module, name, value)
+    return previous
+
+
+# Función con el nombre del motor que se está midiendo
+def engine_name(python_engine=False):
+    return "python" if python_engine else compilado.resolve(compilado.BACKEND)
+
+
+# Función para medir un script en un tamaño y una ocupación
+def benchmark_script(script, grid_size, occupancy, python_engine=False, seed=0, min_time=MIN_TIME):
+    module = importlib.import_module(script)
+    cell_size = max(1, min(module.CELL_SIZE, MAX_SURFACE_SIZE // grid_size))
+    constants = {
+        "GRID_SIZE": grid_size,
+        "CELL_SIZE": cell_size,
+        "USE_NUMPY_ENGINE": not python_engine,
+        "FAST_RENDER": not python_engine,
+        "screen": pygame.Surface((grid_size * cell_size, grid_size * cell_size)),
+    }
+    if hasattr(module, "font"):
+        constants["font"] = pygame.font.Font(None, max(cell_size // 3, 1))
+    cloud_model = hasattr(module, "collect_data")
+    if not cloud_model:
+        constants["INITIAL_DROPLET_PROB"] = occupancy
+    previous = apply_constants(module, constants)
+
+    cells = grid_size * grid_size
+    results = []
+
+    def record(phase, best, mean, per_step=False):
+        entry = {
+            "script": script, "grid_size": grid_size, "occupancy": occupancy,
+            "engine": engine_name(python_engine),
+            "phase": phase, "best_s": best, "mean_s": mean, "ns_per_cell": best / cells * 1e9,
+        }
+        if per_step:
+            entry["steps_per_second"] = 1 / best
+        results.append(entry)
+
+    try:
+        aleatorio.seed(seed)
+        record("initialize_grid", *time_call(module.initialize_grid, tuple, min_time, 1))
+        if cloud_model:
+            grid = random_cloud_grid(grid_size, occupancy, aleatorio.rng)
+        else:
+            grid = module.initialize_grid()
+        occupied = int(np.count_nonzero(grid["humidity"] | grid["cloud"] | grid["act"]) if cloud_model
+                       else np.count_nonzero(grid))
+
+        copy_grid = lambda: (grid.copy(),)
+        simulation_step = ejecucion.step_function(module)
+        record("simulation_step", *time_call(simulation_step, copy_grid, min_time), per_step=True)
+        for rule in module.rules() if hasattr(module, "rules") else []:
+            record(rule.name, *time_call(rule.apply, copy_grid, min_time))
+        for name in UPDATE_FUNCTIONS:
+            if hasattr(module, name):
+                record(name, *time_call(getattr(module, name), copy_grid, min_time))
+
+        collect = module.collect_data if cloud_model else motor.droplet_sizes
+        record(collect.__name__, *time_call(collect, lambda: (grid,), min_time))
+        if cloud_model:
+            collector = estadisticas.SeriesCollector(module.collect_step)
+        else:
+            collector = estadisticas.StreamingStats()
+        record("collector_update", *time_call(collector.update, lambda: (grid,), min_time))
+        record("draw_grid", *time_call(module.draw_grid, lambda: (grid,), min_time))
+
+        memory = peak_memory(simulation_step, grid.copy())
+        for entry in results:
+            entry["occupied_cells"] = occupied
+        results.append({
+            "script": script, "grid_size": grid_size, "occupancy": occupancy,
+            "engine": engine_name(python_engine),
+            "phase": "peak_memory", "simulation_step_bytes": memory,
+        })
+    finally:
+        apply_constants(module, previous)
+    return results
+
+
+# Función para medir un paso del conjunto de réplicas de proyecto2 y cada una
+# de sus reglas, a partir de un conjunto que ya avanzó warmup_steps pasos
+def benchmark_ensemble(n_replicas, grid_size, seed=0, min_time=MIN_TIME, warmup_steps=ENSEMBLE_WARMUP_STEPS):
+    rng = aleatorio.make_generator(seed)
+    grids = conjunto.initialize_ensemble(n_replicas, grid_size, seed)
+    for time_step in range(warmup_steps):
+        grids = conjunto.ensemble_step(grids, rng)
+
+    results = []
+
+    def record(phase, best, mean, per_step=False):
+        entry = {
+            "script": "conjunto", "grid_size": grid_size, "replicas": n_replicas,
+            "occupancy": proyecto2.INITIAL_DROPLET_PROB, "engine": engine_name(),
+            "phase": phase, "best_s": best, "mean_s": mean, "ns_per_cell": best / grids.size * 1e9,
+            "occupied_cells": int(np.count_nonzero(grids)),
+        }
+        if per_step:
+            entry["steps_per_second"] = 1 / best
+            entry["replica_steps_per_second"] = n_replicas / best
+        results.append(entry)
+
+    copy_grids = lambda: (grids.copy(), rng)
+    record("ensemble_step", *time_call(conjunto.ensemble_step, copy_grids, min_time), per_step=True)
+    for rule in proyecto2.rules():
+        record(rule.name, *time_call(rule.apply, copy_grids, min_time))
+    record("ensemble_metrics", *time_call(conjunto.ensemble_metrics, lambda: (grids,), min_time))
+    return results
+
+
+# Función con datos del entorno para interpretar los resultados
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# Función para correr el banco de pruebas completo
+def run_benchmarks(scripts=SCRIPTS, grid_sizes=GRID_SIZES, occupancies=OCCUPANCIES,
+                   python_engine=False, min_time=MIN_TIME, ensemble_replicas=ENSEMBLE_REPLICAS):
+    pygame.font.init()
+    results = []
+    for script in scripts:
+        for grid_size in grid_sizes:
+            for occupancy in occupancies:
+                entries = benchmark_script(script, grid_size, occupancy, python_engine, min_time=min_time)
+                for entry in entries:
+                    if "best_s" in entry:
+                        print(f"{script:14s} {grid_size:5d} {occupancy:4.2f} {entry['phase']:22s} "
+                              f"{entry['best_s'] * 1e3:10.3f} ms {entry['ns_per_cell']:10.1f} ns/celda")
+                results.extend(entries)
+    for n_replicas in ensemble_replicas:
+        entries = benchmark_ensemble(n_replicas, proyecto2.GRID_SIZE, min_time=min_time)
+        for entry in entries:
+            print(f"{'conjunto':14s} {n_replicas:5d}x{entry['grid_size']:<3d} {entry['phase']:22s} "
+                  f"{entry['best_s'] * 1e3:10.3f} ms {entry['ns_per_cell']:10.1f} ns/celda")
+        print(f"{'conjunto':14s} {n_replicas:5d}x{entries[0]['grid_size']:<3d} "
+              f"{entries[0]['steps_per_second']:.0f} pasos/s del conjunto")
+        results.extend(entries)
+    return {"environment": environment(), "results": results}
+
+
+# Función para comparar dos archivos de resultados. Devuelve las fases que se
+# volvieron más lentas que threshold veces el valor anterior.
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    key = lambda entry: (entry["script"], entry["grid_size"], entry.get("replicas"), entry["occupancy"],
+                         entry["engine"], entry["phase"])
+    previous = {key(entry): entry for entry in old["results"] if "best_s" in entry}
+    regressions = []
+    for entry in new["results"]:
+        if "best_s" not in entry or key(entry) not in previous:
+            continue
+        ratio = entry["best_s"] / previous[key(entry)]["best_s"]
+        marker = "  <-- más lento" if ratio > threshold else ""
+        print(f"{' '.join(str(part) for part in key(entry)):60s} {ratio:6.2f}x{marker}")
+        if ratio > threshold:
+            regressions.append((key(entry), ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento de los modelos")
+    parser.add_argument("--scripts", nargs="*", default=SCRIPTS, help="Scripts a medir (sin valores, sólo el conjunto)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=GRID_SIZES)
+    parser.add_argument("--occupancies", type=float, nargs="+", default=OCCUPANCIES)
+    parser.add_argument("--python-engine", action="store_true",
+                        help="Medir los bucles originales de proyecto5 (USE_NUMPY_ENGINE en False) y el "
+                             "dibujo por celdas (FAST_RENDER en False); el motor sólo cambia en proyecto5")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="Segundos mínimos de medición por fase")
+    parser.add_argument("--ensemble-replicas", type=int, nargs="*", default=ENSEMBLE_REPLICAS,
+                        help="Réplicas del caso conjunto (sin valores, no se mide)")
+    parser.add_argument("--backend", choices=compilado.BACKENDS, default=compilado.BACKEND,
+                        help="Núcleos de los bucles por celda: numpy, numba o auto (numba si está instalado)")
+    parser.add_argument("--output", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--compare", default=None,
+                        help="Archivo JSON de una corrida anterior contra el cual comparar")
+    args = parser.parse_args()
+    compilado.BACKEND = args.backend
+    compilado.enabled()  # Falla ya si se pidió numba sin tenerlo instalado
+
+    report = run_benchmarks(args.scripts, args.sizes, args.occupancies, args.python_engine, args.min_time,
+                            args.ensemble_replicas)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report)
+        print(f"{len(regressions)} fases más lentas que {REGRESSION_THRESHOLD}x")
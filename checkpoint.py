@@ -0,0 +1,81 @@
+import os
+import pickle
+
+import aleatorio
+
+# Puntos de control para corridas largas: cada cierto número de pasos se
+# guarda la cuadrícula, el paso alcanzado, el recolector de estadísticas y el
+# estado exacto del generador de aleatorio.py. Al reanudar se restaura el
+# generador, así que la corrida continúa igual, bit a bit, que si no se
+# hubiera interrumpido.
+
+CHECKPOINT_VERSION = 2  # Se incrementa si cambia el contenido guardado
+DEFAULT_EVERY = 500  # Pasos entre puntos de control si no se indica otro valor
+
+
+# Función para escribir un archivo de forma atómica: write(f) escribe en un
+# temporal de la misma carpeta que luego se renombra con os.replace, así que
+# una caída a mitad de la escritura deja intacto el archivo anterior
+def atomic_write(path, write, mode="wb"):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Función para guardar datos con pickle de forma atómica (ver atomic_write)
+def atomic_pickle(path, data):
+    atomic_write(path, lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+# Función para guardar un punto de control
+def save_checkpoint(path, time_step, grid, collector):
+    atomic_pickle(path, {
+        "version": CHECKPOINT_VERSION,
+        "time_step": time_step,
+        "grid": grid,
+        "collector": collector,
+        "rng_state": aleatorio.rng.bit_generator.state,
+    })
+
+
+# Función para leer un punto de control y restaurar el generador
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} tiene un punto de control de otra versión")
+    generator = aleatorio.make_generator()
+    generator.bit_generator.state = state["rng_state"]
+    aleatorio.rng = generator
+    return state
+
+
+# Puntos de control de una corrida: path es el archivo, every la cantidad de
+# pasos entre guardados y resume indica si se continúa desde path cuando
+# existe. Los bucles de ejecucion.py y concurrente.py llaman a start() antes
+# del primer paso, a step() después de cada uno y a save() al terminar.
+class Checkpointer:
+    def __init__(self, path, every=DEFAULT_EVERY, resume=False):
+        self.path = path
+        self.every = every
+        self.resume = resume
+
+    # Devuelve (cuadrícula, recolector, paso inicial): los del punto de
+    # control si se reanuda, o los recibidos y el paso 0 si no
+    def start(self, initialize_grid, collector):
+        if self.resume and os.path.exists(self.path):
+            state = load_checkpoint(self.path)
+            print(f"Reanudando desde {self.path} en el paso {state['time_step']}")
+            return state["grid"], state["collector"], state["time_step"]
+        return initialize_grid(), collector, 0
+
+    # Guarda si time_step (pasos completados) es múltiplo de every
+    def step(self, time_step, grid, collector):
+        if self.every and time_step % self.every == 0:
+            self.save(time_step, grid, collector)
+
+    def save(self, time_step, grid, collector):
+        save_checkpoint(self.path, time_step, grid, collector)
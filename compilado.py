@@ -0,0 +1,276 @@
+import argparse
+import functools
+import importlib
+import importlib.util
+
+import numpy as np
+
+import aleatorio
+
+# Núcleos compilados con Numba (opcional) para los bucles por celda del
+# movimiento, la división de gotas y el autómata de proyecto5. Recorren la
+# cuadrícula una sola vez, sin los arreglos intermedios de las versiones
+# vectorizadas de motor.py y motor_nubes.py.
+#
+# Por defecto se usa NumPy, así que instalar Numba no cambia los resultados
+# de una semilla (ni los guardados en la caché de barrido.py); los núcleos se
+# activan con BACKEND = "numba" o "auto", o con --backend en los scripts y en
+# barrido.py. Numba se importa recién al compilar el primer núcleo, así que
+# con el backend de NumPy no se paga su tiempo de importación.
+#
+# Numba usa su propio generador, que cada llamada siembra con un entero
+# sacado del generador de la corrida (aleatorio.rng), así que una semilla
+# reproduce la corrida dentro de un mismo backend. Los dos backends sortean
+# distinto: sus resultados son equivalentes en distribución, no idénticos
+# (ver compare_backends).
+
+BACKENDS = ("auto", "numpy", "numba")
+BACKEND = "numpy"  # "auto" usa Numba si está instalado y si no NumPy
+AVAILABLE = importlib.util.find_spec("numba") is not None  # Sin importarlo
+
+
+# Función para compilar un núcleo la primera vez que se llama; sin Numba
+# queda como función de Python. La función original queda en py_func.
+def njit(function):
+    compiled = []
+
+    @functools.wraps(function)
+    def kernel(*args):
+        if not compiled:
+            if AVAILABLE:
+                import numba
+
+                compiled.append(numba.njit(cache=True)(function))
+            else:
+                compiled.append(function)
+        return compiled[0](*args)
+
+    kernel.py_func = function
+    return kernel
+
+
+# Función con el backend que se usa de verdad ("numpy" o "numba") para un
+# valor de BACKEND
+def resolve(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"BACKEND debe ser uno de {BACKENDS}, no {backend!r}")
+    if backend == "numba" and not AVAILABLE:
+        raise ValueError("El backend numba necesita el paquete numba instalado")
+    return "numba" if backend != "numpy" and AVAILABLE else "numpy"
+
+
+# Función que indica si se usan los núcleos compilados según BACKEND
+def enabled():
+    return resolve(BACKEND) == "numba"
+
+
+# Función con la semilla de Numba para una llamada
+def kernel_seed(rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    return int(rng.integers(2**32))
+
+
+# Núcleo del movimiento sobre cuadrículas (planos, filas, columnas). Cada
+# gota elige al azar entre los movimientos de su clase de tamaño que caen
+# dentro de la cuadrícula y se suma en su celda de llegada; si no tiene
+# ninguno sale de la cuadrícula.
+@njit
+def move_kernel(grid, moves, thresholds, class_masks, seed):
+    np.random.seed(seed)
+    planes, rows, cols = grid.shape
+    new_grid = np.zeros_like(grid)
+    valid = np.empty(len(moves), dtype=np.intp)
+    for p in range(planes):
+        for i in range(rows):
+            for j in range(cols):
+                size = grid[p, i, j]
+                if size <= 0:
+                    continue
+                droplet_class = 0
+                for threshold in thresholds:
+                    if size > threshold:
+                        droplet_class += 1
+                n = 0
+                for k in range(len(moves)):
+                    ni, nj = i + moves[k, 0], j + moves[k, 1]
+                    if class_masks[droplet_class, k] and 0 <= ni < rows and 0 <= nj < cols:
+                        valid[n] = k
+                        n += 1
+                if n == 0:
+                    continue
+                k = valid[int(np.random.random() * n)]
+                new_grid[p, i + moves[k, 0], j + moves[k, 1]] += size
+    return new_grid
+
+
+# Núcleo de la división sobre una cuadrícula (planos, filas, columnas), en su
+# lugar y con la regla de motor.plan_splits: cada gota sorteada elige un
+# vecino vacío de la cuadrícula de antes de dividir y, si varias eligen la
+# misma celda, gana la primera (first_wins) o una al azar (muestreo de
+# reservorio: la n-ésima en llegar reemplaza a la anterior con prob. 1/n).
+@njit
+def split_kernel(grid, threshold, prob, moves, first_wins, seed):
+    np.random.seed(seed)
+    planes, rows, cols = grid.shape
+    owner = np.full(grid.size, -1, dtype=np.intp)
+    contenders = np.zeros(grid.size, dtype=np.intp)
+    sources = np.empty(grid.size, dtype=np.intp)
+    targets = np.empty(grid.size, dtype=np.intp)
+    valid = np.empty(len(moves), dtype=np.intp)
+    flat = grid.reshape(-1)
+    n_splits = 0
+    for p in range(planes):
+        for i in range(rows):
+            for j in range(cols):
+                cell = (p * rows + i) * cols + j
+                if flat[cell] <= threshold or np.random.random() >= prob:
+                    continue
+                n = 0
+                for k in range(len(moves)):
+                    ni, nj = i + moves[k, 0], j + moves[k, 1]
+                    if 0 <= ni < rows and 0 <= nj < cols and flat[(p * rows + ni) * cols + nj] == 0:
+                        valid[n] = k
+                        n += 1
+                if n == 0:
+                    continue
+                k = valid[int(np.random.random() * n)]
+                target = (p * rows + i + moves[k, 0]) * cols + j + moves[k, 1]
+                contenders[target] += 1
+                if owner[target] < 0 or (not first_wins and np.random.random() * contenders[target] < 1):
+                    owner[target] = n_splits
+                sources[n_splits] = cell
+                targets[n_splits] = target
+                n_splits += 1
+
+    for s in range(n_splits):
+        if owner[targets[s]] != s:
+            continue
+        size = flat[sources[s]]
+        kept = 1 + np.random.random() * (size - 2)
+        fragment = size - kept
+        if kept < size / 2:
+            kept = size - fragment
+        flat[sources[s]] = kept
+        flat[targets[s]] = fragment
+    return grid
+
+
+# Núcleo del autómata de proyecto5 (reglas 2-5 y expansión de humedad) con el
+# mismo recorrido por celda que update_grid
+@njit
+def cloud_kernel(humidity, cloud, act, prob_extinction, prob_act, prob_spread, seed):
+    np.random.seed(seed)
+    rows, cols = humidity.shape
+    new_humidity, new_cloud, new_act = humidity.copy(), cloud.copy(), act.copy()
+    for i in range(rows):
+        for j in range(cols):
+            near_humidity = near_cloud = near_act = False
+            for ni in range(max(i - 1, 0), min(i + 2, rows)):
+                for nj in range(max(j - 1, 0), min(j + 2, cols)):
+                    if ni != i or nj != j:
+                        near_humidity |= humidity[ni, nj]
+                        near_cloud |= cloud[ni, nj]
+                        near_act |= act[ni, nj]
+
+            # Regla 2: cloud o act con un vecino activo o nublado -> cloud
+            if (cloud[i, j] or act[i, j]) and (near_act or near_cloud):
+                new_cloud[i, j] = True
+            # Regla 3: humidity sin act con un vecino activo -> act
+            if not act[i, j] and humidity[i, j] and near_act:
+                new_act[i, j] = True
+            # Regla 4: cada nube se extingue con probabilidad prob_extinction
+            if cloud[i, j] and np.random.random() < prob_extinction:
+                new_cloud[i, j] = False
+            # Regla 5: sin act y con un vecino húmedo o activo -> act con probabilidad prob_act
+            if not act[i, j] and (near_humidity or near_act) and np.random.random() < prob_act:
+                new_act[i, j] = True
+            # Expansión de humedad desde los vecinos húmedos
+            if not humidity[i, j] and near_humidity and np.random.random() < prob_spread:
+                new_humidity[i, j] = True
+    return new_humidity, new_cloud, new_act
+
+
+# Función equivalente a motor.move_droplets con el núcleo compilado
+def move_droplets(grid, moves, thresholds=None, class_masks=None, rng=None):
+    moves = np.asarray(moves, dtype=np.intp)
+    if thresholds is None:
+        thresholds, class_masks = [], np.ones((1, len(moves)), dtype=bool)
+    planes = grid.reshape(-1, *grid.shape[-2:])
+    new_grid = move_kernel(
+        planes, moves, np.asarray(thresholds, dtype=float), np.asarray(class_masks, dtype=bool), kernel_seed(rng),
+    )
+    return new_grid.reshape(grid.shape)
+
+
+# Función equivalente a la regla motor.Splitting sobre una cuadrícula densa
+def split_droplets(grid, threshold, prob, moves, collisions="random", rng=None):
+    planes = grid.reshape(-1, *grid.shape[-2:])
+    split_kernel(
+        planes, float(threshold), float(prob), np.asarray(moves, dtype=np.intp), collisions == "first",
+        kernel_seed(rng),
+    )
+    return grid
+
+
+# Función equivalente a proyecto5.update_grid sobre la cuadrícula estructurada
+def update_cloud_grid(grid, prob_extinction, prob_act, prob_spread, rng=None):
+    new_grid = np.zeros_like(grid)
+    new_grid["humidity"], new_grid["cloud"], new_grid["act"] = cloud_kernel(
+        grid["humidity"], grid["cloud"], grid["act"], prob_extinction, prob_act, prob_spread, kernel_seed(rng),
+    )
+    return new_grid
+
+
+# Función para correr un script con cada backend y las mismas semillas y
+# comparar las medias de sus estadísticas por paso. Para cada métrica
+# devuelve la media entre semillas y su error estándar en cada backend y la
+# diferencia medida en errores estándar (z); con backends equivalentes |z|
+# suele quedar por debajo de 3.
+def compare_backends(script, steps, seeds, backends=("numpy", "numba")):
+    global BACKEND
+    import ejecucion  # ejecucion importa motor, que importa este módulo
+
+    module = importlib.import_module(script)
+    previous = BACKEND
+    means = {}
+    try:
+        for backend in backends:
+            BACKEND = backend
+            for seed in seeds:
+                aleatorio.seed(seed)
+                statistics = ejecucion.run_model(module, steps)["statistics"]
+                for name, moments in statistics.items():
+                    if isinstance(moments, dict):
+                        means.setdefault(name, {}).setdefault(backend, []).append(moments["mean"])
+    finally:
+        BACKEND = previous
+
+    comparison = {}
+    for name, by_backend in means.items():
+        summary = {
+            backend: (float(np.mean(values)), float(np.std(values, ddof=1) / np.sqrt(len(values))))
+            for backend, values in by_backend.items()
+        }
+        (mean_a, error_a), (mean_b, error_b) = (summary[backend] for backend in backends)
+        error = np.hypot(error_a, error_b)
+        summary["z"] = float((mean_a - mean_b) / error) if error > 0 else 0.0
+        comparison[name] = summary
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara los backends NumPy y Numba de un script")
+    parser.add_argument("script", help="Nombre del script, por ejemplo proyecto3")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seeds", type=int, nargs="+", default=list(range(10)))
+    args = parser.parse_args()
+
+    if len(args.seeds) < 2:
+        raise ValueError("Se necesitan al menos dos semillas para estimar el error estándar")
+    if not AVAILABLE:
+        raise ValueError("El backend numba necesita el paquete numba instalado")
+    for name, summary in compare_backends(args.script, args.steps, args.seeds).items():
+        numpy_mean, numpy_error = summary["numpy"]
+        numba_mean, numba_error = summary["numba"]
+        print(f"{name}: numpy {numpy_mean:.4f} ± {numpy_error:.4f}, "
+              f"numba {numba_mean:.4f} ± {numba_error:.4f}, z = {summary['z']:+.2f}")
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import numpy as np
+
+import ejecucion
+import estadisticas
+import particulas
+import perfilado
+
+# Simulación y visualización desacopladas: la física corre en un hilo propio
+# tan rápido como puede y publica fotos de la cuadrícula en un buffer
+# acotado; el bucle de pygame dibuja la foto más reciente a su propio ritmo y
+# descarta las intermedias.
+
+
+# Buffer de fotos con a lo sumo tres arreglos: el que se está dibujando, el
+# más reciente pendiente de dibujar y el que está escribiendo la simulación.
+# Publicar sobre una foto pendiente la reemplaza (cuenta como descartada).
+class SnapshotBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = None  # (time_step, grid) más reciente sin dibujar
+        self.free = []  # Arreglos ya dibujados que se pueden reutilizar
+        self.published = 0
+        self.dropped = 0
+
+    # Copia la cuadrícula (densa, aunque el estado sea de partículas) en un
+    # arreglo libre y la deja como foto pendiente
+    def publish(self, time_step, grid):
+        grid = particulas.as_grid(grid)
+        with self.lock:
+            buffer = self.free.pop() if self.free else None
+        if buffer is None or buffer.shape != grid.shape or buffer.dtype != grid.dtype:
+            buffer = grid.copy()
+        else:
+            np.copyto(buffer, grid)
+        with self.lock:
+            if self.pending is not None:
+                self.free.append(self.pending[1])
+                self.dropped += 1
+            self.pending = (time_step, buffer)
+            self.published += 1
+
+    # Devuelve la foto pendiente (o None) y la saca del buffer
+    def take(self):
+        with self.lock:
+            snapshot, self.pending = self.pending, None
+        return snapshot
+
+    # Devuelve al buffer un arreglo que ya se terminó de dibujar
+    def release(self, grid):
+        with self.lock:
+            if len(self.free) < 2:
+                self.free.append(grid)
+
+
+# Función que corre la simulación en un hilo y dibuja en el hilo principal.
+# collector y checkpoints funcionan como en ejecucion.run_headless y
+# draw_frame(grid) dibuja una foto completa. El bucle atiende los eventos de
+# pygame en cada cuadro, así que la ventana responde a QUIT aunque la física
+# esté ocupada. Devuelve las series recolectadas (como run_headless) y
+# muestra los pasos por segundo y los cuadros dibujados.
+def run_decoupled(initialize_grid, simulation_step, collector, draw_frame, max_steps, clock, fps,
+                  checkpoints=None):
+    import pygame
+
+    buffer = SnapshotBuffer()
+    stop = threading.Event()
+    progress = {"steps": 0, "elapsed": 0.0}
+    state = {"collector": collector, "error": None}  # Al reanudar se reemplaza por el del punto de control
+
+    # Un error en el hilo de la simulación se guarda para relanzarlo en el
+    # hilo principal después de join
+    def simulate():
+        try:
+            run_simulation()
+        except BaseException as error:
+            state["error"] = error
+
+    def run_simulation():
+        start = time.perf_counter()
+        if checkpoints is None:
+            grid, start_step = initialize_grid(), 0
+        else:
+            grid, state["collector"], start_step = checkpoints.start(initialize_grid, collector)
+        estadisticas.start(state["collector"], start_step, grid)
+        buffer.publish(start_step, grid)
+        time_step = start_step
+        for time_step in range(start_step + 1, max_steps + 1):
+            if stop.is_set() or estadisticas.converged(state["collector"]):
+                time_step -= 1
+                break
+            grid = simulation_step(grid)
+            perfilado.tick("paso")
+            with perfilado.phase("estadisticas"):
+                state["collector"].update(grid)
+            buffer.publish(time_step, grid)
+            progress["steps"] = time_step - start_step
+            if checkpoints is not None:
+                checkpoints.step(time_step, grid, state["collector"])
+        # Al cerrar la ventana también se guarda, así no se pierde lo avanzado
+        if checkpoints is not None:
+            checkpoints.save(time_step, grid, state["collector"])
+        progress["elapsed"] = time.perf_counter() - start
+
+    worker = threading.Thread(target=simulate, name="simulacion", daemon=True)
+    worker.start()
+
+    frames = 0
+    shown = None
+    while worker.is_alive() or buffer.pending is not None:
+        for event in pygame.event.get():
+            perfilado.profiler.handle_event(event)
+            if event.type == pygame.QUIT:
+                stop.set()
+        if stop.is_set():
+            break
+
+        snapshot = buffer.take()
+        if snapshot is not None:
+            _, grid = snapshot
+            draw_frame(grid)
+            frames += 1
+            if shown is not None:
+                buffer.release(shown)
+            shown = grid
+        clock.tick(fps)
+
+    stop.set()
+    worker.join()
+    if state["error"] is not None:
+        raise state["error"]
+    steps, elapsed = progress["steps"], progress["elapsed"]
+    print(f"{steps} pasos en {elapsed:.2f} s ({steps / max(elapsed, 1e-9):.0f} pasos/s), "
+          f"{frames} cuadros dibujados, {buffer.dropped} fotos descartadas")
+    return state["collector"].results()
+
+
+# Función para correr un script con la física en un hilo aparte: abre su
+# ventana (ver ejecucion.init_display), la ventana dibuja la foto más
+# reciente a FPS cuadros por segundo y al terminar devuelve las series
+def run_threaded(module, max_steps=None, record=None, checkpoints=None):
+    import pygame
+
+    max_steps = module.MAX_TIME_STEPS if max_steps is None else max_steps
+    ejecucion.init_display(module)
+    series = run_decoupled(
+        module.initialize_grid, ejecucion.step_function(module), ejecucion.make_collector(module, record),
+        lambda grid: ejecucion.draw_frame(module, grid), max_steps, module.clock, module.FPS, checkpoints,
+    )
+    pygame.quit()
+    return series
@@ -0,0 +1,96 @@
+import argparse
+import time
+
+import numpy as np
+
+import aleatorio
+import compilado
+import motor
+import proyecto2
+
+# Conjunto (ensemble) de réplicas independientes del modelo de estado
+# estacionario de proyecto2. El estado es un arreglo (N_replicas, GRID_SIZE,
+# GRID_SIZE) y cada etapa avanza todas las réplicas con una sola llamada
+# vectorizada. Las reglas se piden a proyecto2 en cada paso, así que cambiar
+# sus constantes cambia también el conjunto.
+#
+# Semillas: la réplica i empieza con una cuadrícula sorteada con
+# aleatorio.child_generator(seed, i), así que su condición inicial no depende
+# de cuántas réplicas haya. La dinámica usa un único generador para todo el
+# conjunto (el paso es una sola llamada vectorizada), de modo que la
+# trayectoria de una réplica sí depende de N; las réplicas siguen siendo
+# independientes entre sí.
+#
+# Con compilado.BACKEND en "numba" (--backend) el movimiento recorre todas
+# las réplicas en un solo núcleo compilado (compilado.move_kernel), que ya
+# trabaja sobre (planos, filas, columnas).
+
+
+# Función para inicializar N réplicas con gotas de tamaño normal(5, 2), cada
+# una con su generador hijo de seed
+def initialize_ensemble(n_replicas, grid_size=None, seed=None):
+    grid_size = proyecto2.GRID_SIZE if grid_size is None else grid_size
+    return np.stack([
+        motor.random_grid((grid_size, grid_size), proyecto2.INITIAL_DROPLET_PROB, rng=rng)
+        for rng in aleatorio.child_generators(seed, n_replicas)
+    ])
+
+
+# Función con un paso completo del conjunto: las mismas reglas de proyecto2
+# (motor.py), aplicadas a todas las réplicas a la vez
+def ensemble_step(grids, rng=None):
+    return motor.apply_rules(grids, proyecto2.rules(), rng)
+
+
+# Función para calcular las métricas de cada réplica (reducidas en el eje 0)
+def ensemble_metrics(grids):
+    droplet_counts = np.count_nonzero(grids, axis=(1, 2))
+    total_mass = grids.sum(axis=(1, 2))
+    mean_sizes = np.divide(
+        total_mass, droplet_counts,
+        out=np.zeros(len(grids)), where=droplet_counts > 0,
+    )
+    return {
+        "mean_sizes": mean_sizes,
+        "droplet_counts": droplet_counts,
+        "total_mass": total_mass,
+    }
+
+
+# Función para correr el conjunto y devolver las series por réplica.
+# Cada serie tiene forma (max_steps, n_replicas).
+def run_ensemble(n_replicas, max_steps, grid_size=None, seed=None):
+    seed = aleatorio.seed_sequence(seed)  # Con None, la misma entropía para las condiciones iniciales y los pasos
+    grids = initialize_ensemble(n_replicas, grid_size, seed)
+    rng = aleatorio.make_generator(seed)
+    series = {}
+    for time_step in range(max_steps):
+        grids = ensemble_step(grids, rng)
+        for name, values in ensemble_metrics(grids).items():
+            series.setdefault(name, []).append(values)
+    return grids, {name: np.array(values) for name, values in series.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conjunto de réplicas del modelo de proyecto2")
+    parser.add_argument("--replicas", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--grid-size", type=int, default=proyecto2.GRID_SIZE)
+    parser.add_argument("--seed", type=int, default=None, help="Semilla del generador aleatorio")
+    parser.add_argument("--backend", choices=compilado.BACKENDS, default=compilado.BACKEND,
+                        help="Núcleos de los bucles por celda: numpy, numba o auto (numba si está instalado)")
+    args = parser.parse_args()
+    compilado.BACKEND = args.backend
+    compilado.enabled()  # Falla ya si se pidió numba sin tenerlo instalado
+
+    start = time.perf_counter()
+    grids, series = run_ensemble(args.replicas, args.steps, args.grid_size, args.seed)
+    elapsed = time.perf_counter() - start
+
+    final_means = series["mean_sizes"][-1]
+    print(f"{args.replicas} réplicas de {args.grid_size}x{args.grid_size}, {args.steps} pasos en {elapsed:.2f} s "
+          f"({compilado.resolve(compilado.BACKEND)})")
+    print(f"{args.steps / elapsed:.1f} pasos/s del conjunto, "
+          f"{args.replicas * args.steps / elapsed:.0f} pasos-réplica/s")
+    print(f"Tamaño medio final: {final_means.mean():.3f} ± {final_means.std():.3f}")
+    print(f"Número medio de gotas final: {series['droplet_counts'][-1].mean():.1f}")
@@ -0,0 +1,287 @@
+import argparse
+import json
+
+import numpy as np
+
+import aleatorio
+import checkpoint
+import compilado
+import estadisticas
+import motor
+import perfilado
+import trayectorias
+
+# Ejecución común de todos los scripts. Cada script es la configuración de un
+# modelo: sus constantes, rules() (o simulation_step en proyecto5),
+# initialize_grid, draw_grid y plot_results. Aquí están el paso, el
+# recolector, la corrida sin ventana (modo headless), la ventana interactiva,
+# la reproducción de trayectorias y la línea de comandos, como funciones que
+# reciben el módulo del script. pygame se importa sólo al abrir la ventana.
+
+
+# Función para leer las opciones de línea de comandos de un script
+def parse_args(description, max_steps):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--headless", action="store_true",
+                        help="Ejecutar sin ventana ni pausas entre pasos")
+    parser.add_argument("--steps", type=int, default=max_steps,
+                        help=f"Número de pasos de simulación (por defecto {max_steps})")
+    parser.add_argument("--threaded", action="store_true",
+                        help="Correr la física en un hilo aparte y dibujar sólo la foto más reciente")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semilla del generador aleatorio (ver aleatorio.py); sin ella cada corrida es distinta")
+    parser.add_argument("--output", default=None,
+                        help="Archivo JSON donde guardar las series recolectadas")
+    parser.add_argument("--plots", default=None,
+                        help="Carpeta donde guardar los gráficos (backend Agg, sin ventana)")
+    parser.add_argument("--record", default=None,
+                        help="Archivo donde grabar la cuadrícula de cada paso (con --headless o --threaded)")
+    parser.add_argument("--replay", default=None,
+                        help="Reproducir una trayectoria grabada con --record en lugar de simular")
+    parser.add_argument("--profile", action="store_true",
+                        help="Medir el tiempo de cada fase y mostrar los percentiles al terminar")
+    parser.add_argument("--overlay", action="store_true",
+                        help="Mostrar en la ventana el panel de tiempos (también con la tecla O)")
+    parser.add_argument("--trace", default=None,
+                        help="Archivo JSON de traza de Chrome con todas las fases medidas")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Archivo de puntos de control (con --headless o --threaded)")
+    parser.add_argument("--checkpoint-every", type=int, default=checkpoint.DEFAULT_EVERY,
+                        help=f"Pasos entre puntos de control (por defecto {checkpoint.DEFAULT_EVERY})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continuar desde el archivo de --checkpoint si existe")
+    parser.add_argument("--backend", choices=compilado.BACKENDS, default=compilado.BACKEND,
+                        help="Núcleos de los bucles por celda: numpy, numba o auto (numba si está instalado)")
+    args = parser.parse_args()
+    if (args.record or args.checkpoint) and not (args.headless or args.threaded):
+        parser.error("--record y --checkpoint requieren --headless o --threaded")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requiere --checkpoint")
+    if args.record and args.checkpoint:
+        parser.error("--record no se puede combinar con --checkpoint")
+    return args
+
+
+# Función con el paso de un script: su simulation_step si lo define o, en los
+# modelos de gotas, sus reglas aplicadas en orden (rules() se pide en cada
+# paso, así que cambiar las constantes del módulo cambia el paso)
+def step_function(module):
+    if hasattr(module, "simulation_step"):
+        return module.simulation_step
+    return lambda grid: motor.apply_rules(grid, module.rules())
+
+
+# Función que crea el recolector de estadísticas de un script (memoria fija,
+# ver estadisticas.py): las series de collect_step si lo define o las de las
+# gotas, con la detección del estado estacionario si el script tiene
+# STEADY_STATE_TOLERANCE y con la grabación de la trayectoria si se pide record
+def make_collector(module, record=None):
+    if hasattr(module, "collect_step"):
+        collector = estadisticas.SeriesCollector(module.collect_step)
+    else:
+        collector = estadisticas.StreamingStats()
+    collector = estadisticas.detect_steady_state(collector, getattr(module, "STEADY_STATE_TOLERANCE", None))
+    return trayectorias.record_to(collector, record)
+
+
+# Función para ejecutar la simulación lo más rápido posible.
+# collector es un recolector de estadisticas.py: recibe la cuadrícula después
+# de cada paso (update) y al final entrega las series con memoria acotada
+# (results). Con checkpoints (un checkpoint.Checkpointer) la corrida guarda
+# puntos de control periódicos y puede continuar desde el último. Si el
+# recolector detecta el estado estacionario (estadisticas.SteadyStateDetector)
+# la corrida termina antes de max_steps.
+def run_headless(initialize_grid, simulation_step, collector, max_steps, checkpoints=None):
+    if checkpoints is None:
+        grid, start_step = initialize_grid(), 0
+    else:
+        grid, collector, start_step = checkpoints.start(initialize_grid, collector)
+    estadisticas.start(collector, start_step, grid)
+    steps_done = start_step
+    for time_step in range(start_step, max_steps):
+        # Con detección del estado estacionario la corrida puede terminar antes
+        if estadisticas.converged(collector):
+            break
+        grid = simulation_step(grid)
+        perfilado.tick("paso")
+        with perfilado.phase("estadisticas"):
+            collector.update(grid)
+        steps_done = time_step + 1
+        if checkpoints is not None:
+            checkpoints.step(steps_done, grid, collector)
+    if checkpoints is not None:
+        checkpoints.save(steps_done, grid, collector)
+    return collector.results()
+
+
+# Función para correr un script sin ventana y devolver las series recolectadas
+def run_model(module, max_steps=None, record=None, checkpoints=None):
+    max_steps = module.MAX_TIME_STEPS if max_steps is None else max_steps
+    return run_headless(
+        module.initialize_grid, step_function(module), make_collector(module, record), max_steps, checkpoints,
+    )
+
+
+# Función para inicializar PyGame y abrir la ventana de un script. La
+# ventana, el reloj y la fuente quedan en el módulo (screen, clock, font),
+# donde los usa su draw_grid.
+def init_display(module):
+    import pygame
+
+    pygame.init()
+    size = module.GRID_SIZE * module.CELL_SIZE
+    module.screen = pygame.display.set_mode((size, size))
+    pygame.display.set_caption(module.CAPTION)
+    module.clock = pygame.time.Clock()
+    if hasattr(module, "font"):
+        module.font = pygame.font.SysFont("Arial", module.CELL_SIZE // 3)  # Tamaño dinámico para la fuente
+
+
+# Función para dibujar un cuadro completo de un script
+def draw_frame(module, grid):
+    import pygame
+
+    with perfilado.phase("draw_grid"):
+        module.screen.fill(module.BACKGROUND_COLOR)
+        module.draw_grid(grid)
+    perfilado.profiler.draw_overlay(module.screen)
+    pygame.display.flip()
+    perfilado.tick("cuadro")
+
+
+# Función con la simulación interactiva de un script: un paso, sus
+# estadísticas y un cuadro a FPS cuadros por segundo hasta max_steps, hasta
+# cerrar la ventana o hasta llegar al estado estacionario. Con PLOT_AT_END
+# grafica los resultados y con KEEP_WINDOW_OPEN deja la ventana abierta hasta
+# que se cierre.
+def run_window(module, max_steps=None):
+    import pygame
+
+    max_steps = module.MAX_TIME_STEPS if max_steps is None else max_steps
+    init_display(module)
+    simulation_step = step_function(module)
+    grid = module.initialize_grid()
+    stats = make_collector(module)
+    running = True
+    time_step = 0
+
+    while running and time_step < max_steps and not estadisticas.converged(stats):
+        for event in pygame.event.get():
+            perfilado.profiler.handle_event(event)
+            if event.type == pygame.QUIT:
+                running = False
+
+        grid = simulation_step(grid)
+        perfilado.tick("paso")
+        with perfilado.phase("estadisticas"):
+            stats.update(grid)
+        draw_frame(module, grid)
+
+        module.clock.tick(module.FPS)
+        time_step += 1
+
+    results = stats.results()
+    if getattr(module, "PLOT_AT_END", False):
+        module.plot_results(results)
+    while running and getattr(module, "KEEP_WINDOW_OPEN", False):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        draw_frame(module, grid)
+        module.clock.tick(module.FPS)
+    pygame.quit()
+    return results
+
+
+# Función para reproducir en la ventana de un script una trayectoria grabada
+# sin volver a simular
+def replay(module, path):
+    import pygame
+
+    init_display(module)
+    trayectorias.replay(path, lambda grid: draw_frame(module, grid), module.clock, module.FPS)
+    pygame.quit()
+
+
+# Función para convertir valores de NumPy a tipos que JSON entiende
+def to_builtin(value):
+    if isinstance(value, dict):
+        return {name: to_builtin(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# Función para guardar las series en un archivo JSON
+def save_results(path, series):
+    with open(path, "w") as f:
+        json.dump({name: to_builtin(values) for name, values in series.items()}, f)
+
+
+# Función para mostrar un resumen de las series en la consola
+def print_summary(series):
+    statistics = series.get("statistics", {})
+    for name, values in series.items():
+        if name == "time_steps" or not isinstance(values, list) or name not in statistics:
+            continue
+        moments = statistics[name]
+        print(f"{name}: {moments['n']} pasos, valor final {values[-1]:.3f}, "
+              f"media {moments['mean']:.3f} ± {moments['std']:.3f}")
+    if "droplet_sizes" in statistics:
+        sizes = statistics["droplet_sizes"]
+        print(f"droplet_sizes: {sizes['n']} observaciones, media {sizes['mean']:.3f} ± {sizes['std']:.3f}")
+    steady_state = series.get("steady_state")
+    if steady_state is not None and steady_state["converged"]:
+        print(f"Estado estacionario desde el paso {steady_state['equilibration_step']} "
+              f"(terminó en el paso {steady_state['stopped_step']}):")
+        for name, estimate in steady_state["estimates"].items():
+            print(f"  {name}: {estimate['mean']:.3f} ± {estimate['ci']:.3f} (IC 95 %)")
+    elif steady_state is not None:
+        print(f"No se alcanzó el estado estacionario con tolerancia {steady_state['tolerance']}")
+
+
+# Función para lanzar un script: con --headless corre sin ventana, con
+# --threaded separa la física del dibujo (ver concurrente.py), con --replay
+# reproduce una trayectoria grabada y si no abre la simulación interactiva de
+# siempre. En los dos primeros modos se muestran y guardan las series
+# recolectadas y, con --record, se graba la trayectoria (ver trayectorias.py)
+# o, con --checkpoint, se guardan puntos de control (ver checkpoint.py). Con
+# --profile o --trace se miden las fases del bucle (ver perfilado.py) y con
+# --plots se guardan los gráficos del script en una carpeta.
+def run_cli(module, description):
+    args = parse_args(description, module.MAX_TIME_STEPS)
+    aleatorio.seed(args.seed)
+    compilado.BACKEND = args.backend
+    compilado.enabled()  # Falla ya si se pidió numba sin tenerlo instalado
+    if args.profile or args.overlay or args.trace:
+        perfilado.enable(overlay=args.overlay, trace=args.trace is not None)
+    checkpoints = None
+    if args.checkpoint:
+        checkpoints = checkpoint.Checkpointer(args.checkpoint, args.checkpoint_every, args.resume)
+
+    series = None
+    if args.replay:
+        replay(module, args.replay)
+    elif args.headless:
+        series = run_model(module, args.steps, args.record, checkpoints)
+    elif args.threaded:
+        import concurrente
+
+        series = concurrente.run_threaded(module, args.steps, args.record, checkpoints)
+    else:
+        run_window(module, args.steps)
+
+    if series is not None:
+        print_summary(series)
+        if args.output:
+            save_results(args.output, series)
+        if args.plots and hasattr(module, "plot_results"):
+            module.plot_results(series, args.plots)
+    if args.profile or args.trace:
+        perfilado.print_summary()
+    if args.trace:
+        perfilado.profiler.write_trace(args.trace)
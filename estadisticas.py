@@ -0,0 +1,285 @@
+from collections import deque
+
+import numpy as np
+
+import motor
+
+# Estadísticas en flujo con memoria fija. Reemplazan las listas
+# all_droplet_sizes / average_sizes, que crecían con cada paso: aquí cada
+# paso se resume con operaciones vectorizadas sobre las celdas ocupadas y se
+# acumula en contadores de tamaño constante, sin importar MAX_TIME_STEPS.
+
+
+# Momentos en línea (algoritmo de Welford) de una secuencia de valores
+class RunningMoments:
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    # Agrega un valor
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    # Agrega un lote de valores combinando sus momentos (fórmula de Chan)
+    def add_batch(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        total = self.n + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def as_dict(self):
+        return {"n": self.n, "mean": self.mean, "std": float(np.sqrt(self.variance))}
+
+
+# Serie temporal con memoria fija: guarda a lo sumo capacity muestras y,
+# cuando se llena, descarta una de cada dos y duplica el intervalo entre
+# muestras. Siempre conserva el paso 0, una muestra cada stride pasos y el
+# último valor agregado.
+class DecimatedSeries:
+    def __init__(self, capacity=2048):
+        self.capacity = capacity - capacity % 2
+        self.times = np.empty(self.capacity, dtype=np.int64)
+        self.values = np.empty(self.capacity)
+        self.length = 0
+        self.stride = 1
+        self.last = None
+
+    def append(self, time_step, value):
+        self.last = (time_step, value)
+        if time_step % self.stride:
+            return
+        if self.length == self.capacity:
+            half = self.capacity // 2
+            self.times[:half] = self.times[::2]
+            self.values[:half] = self.values[::2]
+            self.length = half
+            self.stride *= 2
+            if time_step % self.stride:
+                return
+        self.times[self.length] = time_step
+        self.values[self.length] = value
+        self.length += 1
+
+    def to_lists(self):
+        times = self.times[:self.length].tolist()
+        values = self.values[:self.length].tolist()
+        if self.last is not None and (not times or times[-1] != self.last[0]):
+            times.append(self.last[0])
+            values.append(float(self.last[1]))
+        return times, values
+
+
+# Recolector de estadísticas de gotas para los modelos de coalescencia.
+# En cada paso registra el tamaño medio, el número de gotas y la masa total
+# (series decimadas y momentos de Welford), los momentos de todos los tamaños
+# observados, un histograma de tamaños de bins fijos (el último paso y el
+# acumulado) y, opcionalmente, las últimas snapshots fotos completas.
+class StreamingStats:
+    def __init__(self, bin_width=1.0, n_bins=100, snapshots=1, series_capacity=2048):
+        self.bin_width = bin_width
+        self.n_bins = n_bins
+        self.time_step = 0
+        self.size_moments = RunningMoments()
+        self.step_moments = {
+            "average_sizes": RunningMoments(),
+            "droplet_counts": RunningMoments(),
+            "total_mass": RunningMoments(),
+        }
+        self.series = {name: DecimatedSeries(series_capacity) for name in self.step_moments}
+        self.histogram = np.zeros(n_bins, dtype=np.int64)
+        self.last_histogram = np.zeros(n_bins, dtype=np.int64)
+        self.snapshots = deque(maxlen=snapshots)
+
+    # Registra un paso a partir de la cuadrícula (o de sus partículas)
+    def update(self, grid):
+        sizes = motor.droplet_sizes(grid)
+        count = len(sizes)
+        mass = float(sizes.sum())
+        values = {
+            "average_sizes": mass / count if count else 0.0,
+            "droplet_counts": count,
+            "total_mass": mass,
+        }
+        for name, value in values.items():
+            self.step_moments[name].add(value)
+            self.series[name].append(self.time_step, value)
+        self.size_moments.add_batch(sizes)
+
+        # El último bin acumula todas las gotas más grandes
+        bins = np.minimum((sizes / self.bin_width).astype(np.intp), self.n_bins - 1)
+        self.last_histogram = np.bincount(bins, minlength=self.n_bins)
+        self.histogram += self.last_histogram
+        if self.snapshots.maxlen:
+            self.snapshots.append(sizes)
+        self.time_step += 1
+
+    # Tamaños de las gotas en el último paso registrado
+    def final_droplet_sizes(self):
+        return self.snapshots[-1] if self.snapshots else np.zeros(0)
+
+    # Resultados en tipos simples: series decimadas, histogramas y momentos
+    def results(self):
+        results = {}
+        for name, series in self.series.items():
+            results["time_steps"], results[name] = series.to_lists()
+        results["final_droplet_sizes"] = self.final_droplet_sizes().tolist()
+        results["size_histogram"] = self.histogram.tolist()
+        results["final_size_histogram"] = self.last_histogram.tolist()
+        results["size_bin_edges"] = (np.arange(self.n_bins + 1) * self.bin_width).tolist()
+        results["statistics"] = {
+            "steps": self.time_step,
+            "droplet_sizes": self.size_moments.as_dict(),
+            **{name: moments.as_dict() for name, moments in self.step_moments.items()},
+        }
+        return results
+
+
+# Recolector genérico para modelos que reportan valores escalares por paso
+# (por ejemplo los conteos de proyecto5): collect_step(grid) devuelve un
+# diccionario {nombre: valor} y cada nombre se guarda en una serie decimada.
+class SeriesCollector:
+    def __init__(self, collect_step, series_capacity=2048):
+        self.collect_step = collect_step
+        self.series_capacity = series_capacity
+        self.time_step = 0
+        self.moments = {}
+        self.series = {}
+
+    def update(self, grid):
+        for name, value in self.collect_step(grid).items():
+            if name not in self.series:
+                self.series[name] = DecimatedSeries(self.series_capacity)
+                self.moments[name] = RunningMoments()
+            self.series[name].append(self.time_step, value)
+            self.moments[name].add(value)
+        self.time_step += 1
+
+    def results(self):
+        results = {}
+        for name, series in self.series.items():
+            results["time_steps"], results[name] = series.to_lists()
+        results["statistics"] = {
+            "steps": self.time_step,
+            **{name: moments.as_dict() for name, moments in self.moments.items()},
+        }
+        return results
+
+
+STEADY_WINDOW = 1000  # Pasos de la ventana sobre la que se decide el estado estacionario
+STEADY_BATCHES = 10  # Lotes de la ventana para los errores estándar (batch means)
+STEADY_Z = 1.96  # Cuantil normal de los intervalos de confianza (95 %)
+
+
+# Recolector que detecta el estado estacionario sobre las métricas escalares
+# de otro recolector (sus series) y pide terminar la corrida. Guarda los
+# últimos window valores de cada métrica y cada check_every pasos los divide
+# en batches lotes consecutivos; con las medias de los lotes (batch means)
+# calcula, para cada métrica:
+# - la deriva: la diferencia entre la media de la segunda mitad de la ventana
+#   y la de la primera, que no debe superar ni z errores estándar ni
+#   tolerance veces la media;
+# - la precisión: el intervalo de confianza de la media de la ventana, cuyo
+#   semiancho no debe superar tolerance veces la media.
+# Cuando todas las métricas cumplen las dos condiciones la corrida está en
+# estado estacionario desde el principio de la ventana (equilibration_step) y
+# sus estimaciones son las medias de la ventana con su intervalo.
+class SteadyStateDetector:
+    def __init__(self, collector, tolerance=0.05, window=STEADY_WINDOW, batches=STEADY_BATCHES,
+                 check_every=None, z=STEADY_Z, metrics=None):
+        if window < 2 * batches or window % batches:
+            raise ValueError("window debe ser un múltiplo de batches y tener al menos dos valores por lote")
+        if batches < 4 or batches % 2:
+            raise ValueError("batches debe ser par y al menos 4")
+        self.collector = collector
+        self.tolerance = tolerance
+        self.window = window
+        self.batches = batches
+        self.check_every = window // 4 if check_every is None else check_every
+        self.z = z
+        self.metrics = metrics
+        self.values = {}
+        self.time_step = 0
+        self.converged = False
+        self.equilibration_step = None
+        self.estimates = None
+
+    def update(self, grid):
+        self.collector.update(grid)
+        if self.metrics is None:
+            self.metrics = list(self.collector.series)
+        position = self.time_step % self.window
+        for name in self.metrics:
+            if name not in self.values:
+                self.values[name] = np.empty(self.window)
+            self.values[name][position] = self.collector.series[name].last[1]
+        self.time_step += 1
+        if not self.converged and self.time_step >= self.window and self.time_step % self.check_every == 0:
+            self.check()
+
+    # Revisa las condiciones de deriva y de precisión sobre la ventana actual
+    def check(self):
+        estimates = {}
+        half = self.batches // 2
+        for name, values in self.values.items():
+            # Los valores en orden cronológico, agrupados en lotes
+            ordered = np.roll(values, -(self.time_step % self.window))
+            batch_means = ordered.reshape(self.batches, -1).mean(axis=1)
+            mean = batch_means.mean()
+            scale = self.tolerance * abs(mean)
+            half_width = self.z * batch_means.std(ddof=1) / np.sqrt(self.batches)
+            drift = batch_means[half:].mean() - batch_means[:half].mean()
+            drift_error = np.sqrt(
+                (batch_means[:half].var(ddof=1) + batch_means[half:].var(ddof=1)) / half
+            )
+            if half_width > scale or abs(drift) > min(self.z * drift_error, scale):
+                return
+            estimates[name] = {"mean": float(mean), "ci": float(half_width)}
+        self.converged = True
+        self.equilibration_step = self.time_step - self.window
+        self.estimates = estimates
+
+    def results(self):
+        results = self.collector.results()
+        results["steady_state"] = {
+            "converged": self.converged,
+            "tolerance": self.tolerance,
+            "window": self.window,
+            "equilibration_step": self.equilibration_step,
+            "stopped_step": self.time_step if self.converged else None,
+            "estimates": self.estimates,
+        }
+        return results
+
+
+# Función para envolver un recolector con la detección del estado
+# estacionario si se dio una tolerancia (None: correr todos los pasos)
+def detect_steady_state(collector, tolerance=None):
+    if tolerance is None:
+        return collector
+    return SteadyStateDetector(collector, tolerance)
+
+
+# Función que indica si un recolector pide terminar la corrida
+def converged(collector):
+    return getattr(collector, "converged", False)
+
+
+# Función para pasarle la cuadrícula inicial a un recolector que la use (por
+# ejemplo, el que graba la trayectoria); los demás sólo ven los pasos
+def start(collector, time_step, grid):
+    if hasattr(collector, "start"):
+        collector.start(time_step, grid)
@@ -0,0 +1,26 @@
+import os
+
+# matplotlib se importa sólo cuando se grafica. Para guardar los gráficos en
+# archivos se usa el backend Agg, que no abre ventanas ni necesita pantalla.
+
+
+# Función que devuelve matplotlib.pyplot; con output_dir usa el backend Agg
+def pyplot(output_dir=None):
+    import matplotlib
+
+    if output_dir is not None:
+        matplotlib.use("Agg")
+        os.makedirs(output_dir, exist_ok=True)
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+# Función para terminar una figura: la muestra en pantalla o, con
+# output_dir, la guarda como output_dir/name.png
+def show(plt, output_dir=None, name="figura"):
+    if output_dir is None:
+        plt.show()
+        return
+    plt.savefig(os.path.join(output_dir, f"{name}.png"), dpi=100)
+    plt.close()
@@ -0,0 +1,368 @@
+import numpy as np
+
+import aleatorio
+import compilado
+import particulas
+import perfilado
+
+# Motor vectorizado para el movimiento y la coalescencia de gotas.
+# Sustituye el doble bucle de Python de move_droplets por operaciones sobre
+# todas las celdas ocupadas a la vez: se sortea una dirección por gota entre
+# sus movimientos válidos y se acumulan los tamaños con un único np.bincount.
+#
+# Los modelos de gotas (proyecto1 a proyecto4Alex) se arman con las reglas del
+# final del archivo: cada script define rules() con su lista de reglas y su
+# paso de simulación es apply_rules(grid, rules()). Con poca ocupación el
+# estado pasa a ser disperso (ver particulas.py). El movimiento y la división
+# sobre cuadrículas densas usan los núcleos de compilado.py si se eligió el
+# backend de Numba (ver compilado.BACKEND).
+
+# Movimientos en las 4 direcciones (proyecto1, proyecto2, proyecto3)
+RANDOM_WALK_MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+
+# Movimientos hacia abajo: abajo, suroeste, sureste (proyecto4)
+FALLING_MOVES = np.array([(1, 0), (1, -1), (1, 1)])
+
+# Movimientos en las 8 direcciones, en el orden de proyecto4_v2 / proyecto4Alex
+ALL_MOVES = np.array([
+    (0, 1), (0, -1), (1, 0), (-1, 0),
+    (1, 1), (1, -1), (-1, 1), (-1, -1)
+])
+
+
+# Función para clasificar las gotas por tamaño.
+# thresholds son los límites superiores (inclusive) de cada clase, así que una
+# gota de tamaño igual al umbral pertenece a la clase más pequeña.
+def size_classes(sizes, thresholds):
+    droplet_class = np.zeros(len(sizes), dtype=np.intp)
+    for threshold in thresholds:
+        droplet_class += sizes > threshold
+    return droplet_class
+
+
+# Tablas para sortear un bit encendido de una máscara de hasta 8 movimientos:
+# MASK_COUNTS[m] es el número de bits de m y MASK_BITS[m, r] la posición del
+# bit r-ésimo
+MASK_COUNTS = np.array([bin(mask).count("1") for mask in range(256)])
+MASK_BITS = np.zeros((256, 8), dtype=np.intp)
+for mask in range(256):
+    bits = [k for k in range(8) if mask >> k & 1]
+    MASK_BITS[mask, :len(bits)] = bits
+
+
+# Función para elegir, por fila, un índice uniforme entre las columnas True
+def choose_valid_moves(valid, rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    if valid.shape[1] <= 8:
+        masks = np.packbits(valid, axis=1, bitorder="little")[:, 0]
+        counts = MASK_COUNTS[masks]
+        picks = (rng.random(len(valid)) * counts).astype(np.intp)
+        return MASK_BITS[masks, picks], counts > 0
+
+    counts = valid.sum(axis=1)
+    picks = (rng.random(len(valid)) * counts).astype(np.intp)
+    # El movimiento elegido es la primera columna cuyo acumulado supera el sorteo
+    chosen = np.argmax(np.cumsum(valid, axis=1) > picks[:, None], axis=1)
+    return chosen, counts > 0
+
+
+# Función para sortear el movimiento de cada gota. sizes son los tamaños en
+# el orden de filas de la cuadrícula; border son las posiciones (en sizes) de
+# las gotas cerca del borde y bi, bj su fila y columna. Si se dan thresholds y
+# class_masks, cada gota sólo puede usar los movimientos marcados en la fila
+# de class_masks de su clase de tamaño (una clase más que umbrales). Devuelve
+# el índice del movimiento de cada gota y si puede moverse (None si todas
+# pueden). La usan move_droplets y particulas.py, así que las dos
+# representaciones consumen los mismos sorteos.
+def choose_droplet_moves(sizes, border, bi, bj, rows, cols, moves, thresholds=None, class_masks=None, rng=None):
+    rng = aleatorio.rng if rng is None else rng
+
+    # En el interior todos los movimientos permitidos caen dentro de la
+    # cuadrícula, así que basta con sortear uno de la lista de su clase
+    if thresholds is None:
+        chosen = (rng.random(len(sizes)) * len(moves)).astype(np.intp)
+        can_move = None
+    else:
+        class_masks = np.asarray(class_masks, dtype=bool)
+        class_counts = class_masks.sum(axis=1)
+        class_moves = np.zeros(class_masks.shape, dtype=np.intp)
+        for c, mask in enumerate(class_masks):
+            class_moves[c, :class_counts[c]] = np.flatnonzero(mask)
+
+        droplet_class = size_classes(sizes, thresholds)
+        counts = class_counts[droplet_class]
+        picks = (rng.random(len(sizes)) * counts).astype(np.intp)
+        chosen = class_moves[droplet_class, picks]
+        can_move = counts > 0
+
+    # En los bordes hay que descartar los movimientos que salen de la cuadrícula
+    if len(border):
+        ni = bi[:, None] + moves[:, 0]
+        nj = bj[:, None] + moves[:, 1]
+        valid = (ni >= 0) & (ni < rows) & (nj >= 0) & (nj < cols)
+        if thresholds is not None:
+            valid &= class_masks[droplet_class[border]]
+        if can_move is None:
+            can_move = np.ones(len(sizes), dtype=bool)
+        chosen[border], can_move[border] = choose_valid_moves(valid, rng)
+    return chosen, can_move
+
+
+# Función para mover todas las gotas a la vez.
+# moves es un arreglo (K, 2) de desplazamientos candidatos; thresholds y
+# class_masks son los de choose_droplet_moves. Las gotas sin movimientos
+# válidos desaparecen (caen al suelo), igual que en los scripts originales.
+# grid puede tener dimensiones extra al principio (por ejemplo un conjunto de
+# réplicas (N, filas, columnas)); las gotas nunca pasan de una cuadrícula a
+# otra.
+def move_droplets(grid, moves=RANDOM_WALK_MOVES, thresholds=None, class_masks=None, rng=None):
+    if compilado.enabled():
+        return compilado.move_droplets(grid, moves, thresholds, class_masks, rng)
+    rows, cols = grid.shape[-2:]
+    flat = grid.ravel()
+    cells = np.flatnonzero(flat > 0)
+    sizes = flat[cells]
+
+    reach = np.abs(moves).max(axis=0)
+    edge = np.ones(grid.shape, dtype=bool)
+    edge[..., reach[0]:rows - reach[0], reach[1]:cols - reach[1]] = False
+    border = np.flatnonzero(edge.ravel()[cells])
+    bi, bj = np.divmod(cells[border] % (rows * cols), cols)
+    chosen, can_move = choose_droplet_moves(sizes, border, bi, bj, rows, cols, moves, thresholds, class_masks, rng)
+
+    offsets = moves[:, 0] * cols + moves[:, 1]
+    targets = cells + offsets[chosen]
+    if can_move is not None:
+        # Las gotas que no pueden moverse van a una celda extra que se descarta
+        targets[~can_move] = grid.size
+
+    # Coalescencia: las gotas que llegan a la misma celda suman su tamaño
+    new_grid = np.bincount(targets, weights=sizes, minlength=grid.size + 1)
+    return new_grid[:-1].reshape(grid.shape)
+
+
+# Función para elegir cada índice de range(n) de forma independiente con
+# probabilidad p. Los saltos entre índices elegidos siguen una distribución
+# geométrica, así que el costo es proporcional al número de elegidos y no a n.
+def bernoulli_indices(n, p, rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    if n == 0 or p <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if p >= 1:
+        return np.arange(n)
+    expected = n * p
+    chunk = int(expected + 4 * np.sqrt(expected) + 16)
+    positions = np.cumsum(rng.geometric(p, chunk)) - 1
+    while positions[-1] < n:
+        positions = np.concatenate([positions, positions[-1] + np.cumsum(rng.geometric(p, chunk))])
+    return positions[:np.searchsorted(positions, n)]
+
+
+# Función para aplicar un campo de probabilidades a celdas ya sorteadas con
+# la probabilidad máxima del campo (thinning): cada celda se acepta con
+# probabilidad prob[celda] / max(prob). prob es un número (entonces se
+# aceptan todas, sin sorteos) o un arreglo que se extiende a (filas,
+# columnas), por ejemplo (filas, 1) para una tasa que cambia con la altura.
+# cells son índices lineales en una cuadrícula shape, que puede tener
+# dimensiones extra al principio. Devuelve la máscara de celdas aceptadas.
+def field_mask(cells, prob, shape, rng=None):
+    if np.ndim(prob) == 0:
+        return np.ones(len(cells), dtype=bool)
+    rng = aleatorio.rng if rng is None else rng
+    rows, cols = shape[-2:]
+    field = np.broadcast_to(prob, (rows, cols))
+    i, j = np.divmod(cells % (rows * cols), cols)
+    return rng.random(len(cells)) * np.max(prob) < field[i, j]
+
+
+# Función para crear una cuadrícula donde cada celda tiene una gota con
+# probabilidad prob, de tamaño max(1, normal(mean, std))
+def random_grid(shape, prob, mean=5, std=2, rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    occupied = rng.random(shape) < prob
+    grid = np.zeros(shape, dtype=float)
+    grid[occupied] = np.maximum(1, rng.normal(mean, std, np.count_nonzero(occupied)))
+    return grid
+
+
+# Función que devuelve los tamaños de todas las gotas, en el orden de filas,
+# de una cuadrícula o de un estado disperso
+def droplet_sizes(grid):
+    if isinstance(grid, particulas.Particles):
+        return grid.sizes
+    return grid[grid > 0]
+
+
+# Reglas de los modelos de gotas. Cada regla tiene un nombre (el de su fase en
+# perfilado.py) y un método apply(grid, rng) que devuelve la cuadrícula
+# siguiente; las reglas que sólo cambian algunas celdas la modifican en su
+# lugar. Todas aceptan dimensiones extra al principio, como move_droplets, y
+# también un estado disperso (particulas.Particles), que delegan en el método
+# equivalente de las partículas.
+
+# Regla de movimiento y coalescencia. Las gotas sin movimientos válidos salen
+# de la cuadrícula: ése es el sumidero del suelo de proyecto4, proyecto4_v2 y
+# proyecto4Alex.
+class Movement:
+    name = "move_droplets"
+
+    def __init__(self, moves=RANDOM_WALK_MOVES, thresholds=None, class_masks=None):
+        self.moves = moves
+        self.thresholds = thresholds
+        self.class_masks = class_masks
+
+    def apply(self, grid, rng=None):
+        if isinstance(grid, particulas.Particles):
+            return grid.move(self.moves, self.thresholds, self.class_masks, rng)
+        return move_droplets(grid, self.moves, self.thresholds, self.class_masks, rng)
+
+
+# Fuente: cada celda vacía recibe con probabilidad prob una gota de tamaño
+# size. prob puede ser un campo de probabilidades (ver field_mask).
+class EmptyCellSource:
+    name = "add_small_droplets"
+
+    def __init__(self, prob, size):
+        self.prob = prob
+        self.size = size
+
+    def apply(self, grid, rng=None):
+        if isinstance(grid, particulas.Particles):
+            return grid.add_to_empty(self.prob, self.size, rng)
+        empty = np.flatnonzero(grid == 0)
+        added = empty[bernoulli_indices(len(empty), np.max(self.prob), rng)]
+        np.put(grid, added[field_mask(added, self.prob, grid.shape, rng)], self.size)
+        return grid
+
+
+# Fuente de la fila superior: cada columna recibe con probabilidad prob una
+# gota de tamaño max(min_size, normal(mean, std)), esté o no ocupada la celda.
+# prob puede ser un arreglo con una probabilidad por columna.
+class TopRowSource:
+    name = "add_small_droplets"
+
+    def __init__(self, prob, mean, std, min_size=1):
+        self.prob = prob
+        self.mean = mean
+        self.std = std
+        self.min_size = min_size
+
+    def apply(self, grid, rng=None):
+        if isinstance(grid, particulas.Particles):
+            return grid.add_to_top_row(self.prob, self.mean, self.std, self.min_size, rng)
+        rng = aleatorio.rng if rng is None else rng
+        top = grid[..., 0, :]
+        added = rng.random(top.shape) < self.prob
+        top[added] = np.maximum(self.min_size, rng.normal(self.mean, self.std, np.count_nonzero(added)))
+        return grid
+
+
+# Sumidero: cada gota mayor que threshold desaparece con probabilidad prob,
+# que puede ser un campo de probabilidades (ver field_mask)
+class LargeDropletSink:
+    name = "remove_large_droplets"
+
+    def __init__(self, prob, threshold):
+        self.prob = prob
+        self.threshold = threshold
+
+    def apply(self, grid, rng=None):
+        if isinstance(grid, particulas.Particles):
+            return grid.remove_large(self.prob, self.threshold, rng)
+        large = np.flatnonzero(grid > self.threshold)
+        removed = large[bernoulli_indices(len(large), np.max(self.prob), rng)]
+        np.put(grid, removed[field_mask(removed, self.prob, grid.shape, rng)], 0)
+        return grid
+
+
+# Formas de resolver dos divisiones que eligen la misma celda vacía: "first"
+# deja la de la gota con la celda menor (en el orden de filas) y "random" una
+# al azar. Las que pierden no se dividen en ese paso.
+SPLIT_COLLISIONS = ("first", "random")
+
+
+# División: cada gota mayor que threshold se parte con probabilidad prob en
+# dos, una en su celda y otra en un vecino vacío elegido al azar. Todas las
+# divisiones de un paso se deciden a la vez sobre la cuadrícula de antes de
+# dividir (ver plan_splits); collisions elige cómo se resuelven dos
+# divisiones que apuntan a la misma celda vacía.
+class Splitting:
+    name = "split_large_droplets"
+
+    def __init__(self, threshold, prob, moves=RANDOM_WALK_MOVES, collisions="random"):
+        if collisions not in SPLIT_COLLISIONS:
+            raise ValueError(f"collisions debe ser uno de {SPLIT_COLLISIONS}, no {collisions!r}")
+        self.threshold = threshold
+        self.prob = prob
+        self.moves = moves
+        self.collisions = collisions
+
+    def apply(self, grid, rng=None):
+        if isinstance(grid, particulas.Particles):
+            return grid.split(self.threshold, self.prob, self.moves, self.collisions, rng)
+        if compilado.enabled():
+            return compilado.split_droplets(grid, self.threshold, self.prob, self.moves, self.collisions, rng)
+        flat = grid.reshape(-1)
+        cells = np.flatnonzero(flat > self.threshold)
+        sources, targets, kept, fragments = plan_splits(
+            cells, flat[cells], grid.shape, lambda targets: flat[targets] == 0,
+            self.prob, self.moves, self.collisions, rng,
+        )
+        flat[sources] = kept
+        flat[targets] = fragments
+        return grid
+
+
+# Función para partir cada tamaño en dos con el primer trozo uniforme en
+# (1, size - 1). El trozo mayor se calcula primero y el otro como la resta,
+# que es exacta en punto flotante (lema de Sterbenz), así que los dos trozos
+# suman exactamente size.
+def split_sizes(sizes, rng):
+    kept = rng.uniform(1, sizes - 1)
+    fragments = sizes - kept
+    kept = np.where(kept >= sizes / 2, kept, sizes - fragments)
+    return kept, fragments
+
+
+# Función para decidir todas las divisiones de un paso de una vez. cells y
+# sizes son las gotas candidatas (mayores que el umbral) en el orden de filas
+# de una cuadrícula shape (que puede tener dimensiones extra al principio) e
+# is_empty(celdas) dice qué celdas están vacías. Cada gota sorteada elige un
+# vecino vacío de la cuadrícula de antes de dividir, así que el resultado no
+# depende del orden del recorrido ni un trozo recién escrito cuenta como
+# ocupado o vacío. Devuelve las celdas de origen y de destino de las
+# divisiones que se hacen y el tamaño que queda en cada una.
+def plan_splits(cells, sizes, shape, is_empty, prob, moves=RANDOM_WALK_MOVES, collisions="random", rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    rows, cols = shape[-2:]
+    selected = bernoulli_indices(len(cells), prob, rng)
+    cells, sizes = cells[selected], sizes[selected]
+
+    i, j = np.divmod(cells % (rows * cols), cols)
+    ni = i[:, None] + moves[:, 0]
+    nj = j[:, None] + moves[:, 1]
+    valid = (ni >= 0) & (ni < rows) & (nj >= 0) & (nj < cols)
+    targets = cells[:, None] + (moves[:, 0] * cols + moves[:, 1])
+    valid[valid] = is_empty(targets[valid])
+    chosen, can_split = choose_valid_moves(valid, rng)
+    targets = targets[np.arange(len(cells)), chosen]
+
+    # Si varias gotas eligen la misma celda vacía sólo una se divide
+    order = np.flatnonzero(can_split)
+    if collisions == "random":
+        order = rng.permutation(order)
+    _, first = np.unique(targets[order], return_index=True)
+    winners = np.sort(order[first])
+
+    kept, fragments = split_sizes(sizes[winners], rng)
+    return cells[winners], targets[winners], kept, fragments
+
+
+# Función con un paso completo: aplica las reglas en orden, cada una medida
+# como una fase de perfilado.py, y elige la representación (densa o
+# partículas) del paso siguiente según la ocupación
+def apply_rules(grid, rules, rng=None):
+    for rule in rules:
+        with perfilado.phase(rule.name):
+            grid = rule.apply(grid, rng)
+    return particulas.adapt(grid)
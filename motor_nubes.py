@@ -0,0 +1,274 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import aleatorio
+import motor
+
+# Motor vectorizado para el autómata de nubes de proyecto5.
+# humidity, cloud y act se guardan como planos de bits empaquetados (8 celdas
+# por byte a lo largo de las columnas, bitorder="little") y los predicados
+# "algún vecino tiene X" se evalúan con desplazamientos y OR sobre los planos
+# completos. Los sorteos sólo se hacen sobre las celdas candidatas de cada
+# regla, así que cuestan en proporción al frente activo.
+
+CloudPlanes = namedtuple("CloudPlanes", ["humidity", "cloud", "act", "cols"])
+
+# Número de bits encendidos de cada byte
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+# Función para empaquetar un plano booleano (filas, columnas)
+def pack_plane(plane):
+    return np.packbits(plane, axis=-1, bitorder="little")
+
+
+# Función para desempaquetar un plano de bits a booleano
+def unpack_plane(packed, cols):
+    return np.unpackbits(packed, axis=-1, count=cols, bitorder="little").view(bool)
+
+
+# Función para convertir la cuadrícula estructurada de proyecto5 en planos
+def pack_grid(grid):
+    return CloudPlanes(
+        pack_plane(grid["humidity"]), pack_plane(grid["cloud"]), pack_plane(grid["act"]),
+        grid.shape[-1],
+    )
+
+
+# Función para volver a la cuadrícula estructurada de proyecto5
+def unpack_grid(planes):
+    humidity = unpack_plane(planes.humidity, planes.cols)
+    grid = np.zeros(humidity.shape, dtype=[("humidity", bool), ("cloud", bool), ("act", bool)])
+    grid["humidity"] = humidity
+    grid["cloud"] = unpack_plane(planes.cloud, planes.cols)
+    grid["act"] = unpack_plane(planes.act, planes.cols)
+    return grid
+
+
+# Función para crear planos vacíos de filas x columnas
+def empty_planes(rows, cols):
+    shape = (rows, (cols + 7) // 8)
+    return CloudPlanes(
+        np.zeros(shape, np.uint8), np.zeros(shape, np.uint8), np.zeros(shape, np.uint8), cols
+    )
+
+
+# Función para inicializar humedad aleatoria en la región central, como
+# initialize_grid de proyecto5 pero para cualquier tamaño
+def initialize_planes(grid_size, radius=3, initial_humidity_prob=0.5, rng=None):
+    rng = aleatorio.rng if rng is None else rng
+    humidity = np.zeros((grid_size, grid_size), dtype=bool)
+    center = grid_size // 2
+    lo, hi = max(center - radius, 0), min(center + radius + 1, grid_size)
+    humidity[lo:hi, lo:hi] = rng.random((hi - lo, hi - lo)) < initial_humidity_prob
+    planes = empty_planes(grid_size, grid_size)
+    return planes._replace(humidity=pack_plane(humidity))
+
+
+# Función con la máscara de bits válidos (los bits de relleno del último byte
+# quedan en cero para que las negaciones no creen celdas fantasma)
+def valid_bits(shape, cols):
+    valid = np.full(shape, 0xFF, dtype=np.uint8)
+    if cols % 8:
+        valid[..., -1] = (1 << (cols % 8)) - 1
+    return valid
+
+
+# Función que indica, por celda, si alguno de sus 8 vecinos está encendido.
+# left[c] es el valor de la celda c-1 y right[c] el de c+1; las filas de
+# arriba y abajo aportan su caja horizontal de 3 celdas.
+def any_neighbor(plane, valid):
+    left = plane << 1
+    left[..., 1:] |= plane[..., :-1] >> 7
+    right = plane >> 1
+    right[..., :-1] |= plane[..., 1:] << 7
+
+    box = plane | left | right
+    neighbors = left | right
+    neighbors[..., 1:, :] |= box[..., :-1, :]
+    neighbors[..., :-1, :] |= box[..., 1:, :]
+    return neighbors & valid
+
+
+# Función para elegir con probabilidad p cada celda encendida de un plano de
+# candidatas. Se sortean bits de Bernoulli sólo para los bytes que tienen
+# alguna candidata y luego se enmascaran con las candidatas, así que el costo
+# es proporcional a p por el área ocupada.
+def bernoulli_bits(candidates, p, rng=None):
+    chosen = np.zeros_like(candidates)
+    flat = candidates.ravel()
+    nonzero = np.flatnonzero(flat)
+    if len(nonzero) == 0:
+        return chosen
+    positions = motor.bernoulli_indices(len(nonzero) * 8, p, rng)
+    # Los bits de un mismo byte son distintos, así que sumarlos equivale a un OR
+    drawn = np.bincount(positions >> 3, weights=1 << (positions & 7), minlength=len(nonzero))
+    chosen.ravel()[nonzero] = drawn.astype(np.uint8) & flat[nonzero]
+    return chosen
+
+
+# Función con las reglas 2-5 de proyecto5 y la expansión de humedad sobre una
+# ventana de planos; valid marca los bits que corresponden a celdas reales
+def update_window(humidity, cloud, act, valid, prob_extinction, prob_act, prob_spread, rng=None):
+    near_act = any_neighbor(act, valid)
+    near_cloud = any_neighbor(cloud, valid)
+    near_humidity = any_neighbor(humidity, valid)
+
+    # Regla 2: cloud o act con un vecino activo o nublado -> cloud
+    new_cloud = cloud | (act & (near_act | near_cloud))
+    # Regla 3: humidity sin act con un vecino activo -> act
+    new_act = act | (humidity & near_act)
+    # Regla 4: cada nube se extingue con probabilidad prob_extinction
+    new_cloud &= ~bernoulli_bits(cloud, prob_extinction, rng)
+    # Regla 5: sin act y con un vecino húmedo o activo -> act con probabilidad prob_act
+    new_act |= bernoulli_bits(~act & (near_humidity | near_act) & valid, prob_act, rng)
+    # Expansión de humedad desde los vecinos húmedos
+    new_humidity = humidity | bernoulli_bits(~humidity & near_humidity & valid, prob_spread, rng)
+
+    return new_humidity, new_cloud, new_act
+
+
+# Función para avanzar un paso del autómata sobre la cuadrícula completa
+def update_planes(planes, prob_extinction, prob_act, prob_spread, rng=None):
+    humidity, cloud, act, cols = planes
+    valid = valid_bits(humidity.shape, cols)
+    new_planes = update_window(humidity, cloud, act, valid, prob_extinction, prob_act, prob_spread, rng)
+    return CloudPlanes(*new_planes, cols)
+
+
+# Tamaño (en celdas) de los bloques del modo por frente activo; múltiplo de 8
+TILE_SIZE = 64
+
+
+# Función que indica qué bloques de tile x tile celdas tienen algún bit
+# encendido. Los bloques del borde pueden ser más pequeños.
+def tile_any(plane, tile=TILE_SIZE):
+    rows, nbytes = plane.shape
+    nonzero = plane != 0
+    by_rows = np.logical_or.reduceat(nonzero, np.arange(0, rows, tile), axis=0)
+    return np.logical_or.reduceat(by_rows, np.arange(0, nbytes, tile // 8), axis=1)
+
+
+# Función con los bloques que tienen humedad, nube o act
+def occupied_tiles(planes, tile=TILE_SIZE):
+    return tile_any(planes.humidity | planes.cloud | planes.act, tile)
+
+
+# Función para agregar a una máscara de bloques sus 8 vecinos
+def dilate_tiles(tiles):
+    grown = tiles.copy()
+    grown[1:] |= tiles[:-1]
+    grown[:-1] |= tiles[1:]
+    rows_grown = grown.copy()
+    grown[:, 1:] |= rows_grown[:, :-1]
+    grown[:, :-1] |= rows_grown[:, 1:]
+    return grown
+
+
+# Función para avanzar un paso actualizando sólo los bloques ocupados y su
+# halo de un bloque. Fuera de ellos ninguna celda tiene vecinos encendidos, así
+# que ninguna regla puede cambiarla. Cada franja de bloques activos contiguos
+# de una fila se actualiza con una celda extra de contexto alrededor; todas
+# las franjas se calculan a partir del estado anterior y luego se escriben en
+# los planos, que se modifican en su lugar. Devuelve los planos y la nueva
+# máscara de bloques ocupados; si casi todo está activo usa el paso completo.
+def update_planes_sparse(planes, occupied, prob_extinction, prob_act, prob_spread,
+                         rng=None, tile=TILE_SIZE, dense_fraction=0.5):
+    active = dilate_tiles(occupied)
+    if active.mean() > dense_fraction:
+        planes = update_planes(planes, prob_extinction, prob_act, prob_spread, rng)
+        return planes, occupied_tiles(planes, tile)
+
+    humidity, cloud, act, cols = planes
+    rows, nbytes = humidity.shape
+    tile_bytes = tile // 8
+    updates = []
+    for tile_row in np.flatnonzero(active.any(axis=1)):
+        tile_cols = np.flatnonzero(active[tile_row])
+        runs = np.split(tile_cols, np.flatnonzero(np.diff(tile_cols) != 1) + 1)
+        for run in runs:
+            r0, r1 = tile_row * tile, min((tile_row + 1) * tile, rows)
+            b0, b1 = run[0] * tile_bytes, min((run[-1] + 1) * tile_bytes, nbytes)
+            # Ventana con una fila y un byte (8 celdas) de contexto
+            wr0, wr1 = max(r0 - 1, 0), min(r1 + 1, rows)
+            wb0, wb1 = max(b0 - 1, 0), min(b1 + 1, nbytes)
+            window = np.s_[wr0:wr1, wb0:wb1]
+            valid = np.full((wr1 - wr0, wb1 - wb0), 0xFF, dtype=np.uint8)
+            if wb1 == nbytes and cols % 8:
+                valid[:, -1] = (1 << (cols % 8)) - 1
+            new_planes = update_window(
+                humidity[window], cloud[window], act[window], valid,
+                prob_extinction, prob_act, prob_spread, rng,
+            )
+            inner = np.s_[r0 - wr0:r1 - wr0, b0 - wb0:b1 - wb0]
+            updates.append((np.s_[r0:r1, b0:b1], [plane[inner] for plane in new_planes]))
+
+    occupied = occupied.copy()
+    for region, new_planes in updates:
+        for plane, new_plane in zip((humidity, cloud, act), new_planes):
+            plane[region] = new_plane
+        r0, b0 = region[0].start, region[1].start
+        tiles = tile_any(new_planes[0] | new_planes[1] | new_planes[2], tile)
+        occupied[r0 // tile, b0 // tile_bytes:b0 // tile_bytes + tiles.shape[1]] = tiles[0]
+    return planes, occupied
+
+
+# Estado del modo por frente activo para proyecto5 (ACTIVE_FRONTIER): los
+# planos de bits y la máscara de bloques ocupados se conservan entre pasos, así
+# que no se empaqueta ni desempaqueta la cuadrícula completa en cada paso. La
+# cuadrícula estructurada (to_grid) sólo se arma para dibujar o grabar.
+class FrontierState:
+    def __init__(self, planes, occupied=None, tile=TILE_SIZE):
+        self.planes = planes
+        self.occupied = occupied_tiles(planes, tile) if occupied is None else occupied
+        self.tile = tile
+
+    @classmethod
+    def from_grid(cls, grid, tile=TILE_SIZE):
+        return cls(pack_grid(grid), tile=tile)
+
+    # Avanza un paso con update_planes_sparse (los planos cambian en su lugar)
+    def step(self, prob_extinction, prob_act, prob_spread, rng=None):
+        planes, occupied = update_planes_sparse(
+            self.planes, self.occupied, prob_extinction, prob_act, prob_spread, rng, self.tile,
+        )
+        return FrontierState(planes, occupied, self.tile)
+
+    def to_grid(self):
+        return unpack_grid(self.planes)
+
+
+# Función para contar las celdas de nube, humedad y act (como collect_data)
+def count_planes(planes):
+    return tuple(
+        int(POPCOUNT[plane].sum(dtype=np.int64))
+        for plane in (planes.cloud, planes.humidity, planes.act)
+    )
+
+
+if __name__ == "__main__":
+    import proyecto5
+
+    parser = argparse.ArgumentParser(description="Motor de planos de bits para proyecto5")
+    parser.add_argument("--grid-size", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--sparse", action="store_true",
+                        help="Actualizar sólo los bloques del frente activo")
+    args = parser.parse_args()
+
+    planes = initialize_planes(args.grid_size)
+    occupied = occupied_tiles(planes)
+    probabilities = (proyecto5.PROB_EXTINCTION, proyecto5.PROB_ACT, proyecto5.HUMIDITY_SPREAD_PROB)
+    start = time.perf_counter()
+    for time_step in range(args.steps):
+        if args.sparse:
+            planes, occupied = update_planes_sparse(planes, occupied, *probabilities)
+        else:
+            planes = update_planes(planes, *probabilities)
+    elapsed = time.perf_counter() - start
+    cloud_count, humidity_count, act_count = count_planes(planes)
+    print(f"{args.grid_size}x{args.grid_size}: {args.steps / elapsed:.1f} pasos/s")
+    print(f"Nubes: {cloud_count}, humedad: {humidity_count}, act: {act_count}")
@@ -0,0 +1,362 @@
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import aleatorio
+import motor
+import motor_nubes
+
+# Pasos en varios núcleos por descomposición del dominio en franjas
+# horizontales. La cuadrícula (y la del paso siguiente) vive en bloques de
+# multiprocessing.shared_memory; cada tarea recibe el nombre de los bloques y
+# trabaja sobre las filas de su franja sin copiar la cuadrícula.
+#
+# - Gotas (proyecto1 a proyecto4Alex): cada franja mueve sus gotas y acumula
+#   los tamaños en sus filas más una fila de halo arriba y otra abajo, para las
+#   gotas que cruzan a la franja vecina. Al terminar la ronda el proceso
+#   principal suma cada halo a la primera o última fila de la vecina.
+# - División (proyecto3): cada franja decide sus divisiones sobre la
+#   cuadrícula de antes de dividir, mirando la fila de halo de cada vecina
+#   para saber si la celda de destino está vacía. Los trozos que caen en su
+#   propia franja se escriben enseguida; los que caen en una vecina quedan
+#   pendientes y, en una segunda fase, el proceso principal los escribe si la
+#   celda sigue vacía (si la vecina también eligió esa celda, gana la suya).
+# - Nubes (proyecto5): cada franja lee una fila de halo de sus vecinas y
+#   calcula sus filas con motor_nubes.update_window.
+#
+# Cada franja tiene su propio generador (aleatorio.child_generator(seed, k))
+# cuyo estado viaja con la tarea, así que el resultado depende de la semilla
+# y del número de franjas pero no del número de procesos: con workers=1 todo
+# corre en el proceso principal y da exactamente lo mismo que en paralelo.
+
+DEFAULT_STRIPS = os.cpu_count() or 1
+
+# Bloques de memoria compartida abiertos en este proceso, por nombre
+attached = {}
+
+
+# Función para crear un arreglo en memoria compartida. Devuelve el bloque y
+# la descripción (nombre, forma, tipo) que usan las tareas para abrirlo.
+def create_shared(shape, dtype):
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    attached[block.name] = block
+    return block, (block.name, tuple(shape), dtype.str)
+
+
+# Función para ver un arreglo compartido a partir de su descripción. En los
+# procesos trabajadores el bloque se abre una vez y se quita del
+# resource_tracker, porque el dueño (el proceso principal) es quien lo borra.
+def shared_array(spec):
+    name, shape, dtype = spec
+    block = attached.get(name)
+    if block is None:
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+        attached[name] = block
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+# Función para repartir rows filas en n franjas de alto parecido
+def strip_bounds(rows, n_strips):
+    edges = np.linspace(0, rows, n_strips + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+# Función que recrea el generador de una franja a partir de su estado
+def strip_generator(state):
+    rng = np.random.Generator(np.random.PCG64())
+    rng.bit_generator.state = state
+    return rng
+
+
+# Función para adaptar una regla local (que sólo mira cada celda) a la franja
+# r0:r1 de una cuadrícula shape: los campos de probabilidades se recortan a la
+# franja y la fuente de la fila superior sólo se aplica en la primera franja
+def strip_rule(rule, r0, r1, shape):
+    if isinstance(rule, motor.TopRowSource):
+        return rule if r0 == 0 else None
+    if isinstance(rule, (motor.EmptyCellSource, motor.LargeDropletSink)):
+        if np.ndim(rule.prob) == 0:
+            return rule
+        prob = np.broadcast_to(rule.prob, shape)[r0:r1]
+        return motor.EmptyCellSource(prob, rule.size) if isinstance(rule, motor.EmptyCellSource) \
+            else motor.LargeDropletSink(prob, rule.threshold)
+    raise ValueError(f"La regla {type(rule).__name__} no se puede aplicar por franjas")
+
+
+# Función para agrupar las reglas de un paso en rondas. Cada ronda son reglas
+# locales seguidas, a lo sumo, de un movimiento o una división, que necesitan
+# sincronizar los halos antes de la regla siguiente.
+def rule_rounds(rules):
+    rounds, current = [], []
+    for rule in rules:
+        if isinstance(rule, (motor.Movement, motor.Splitting)):
+            if np.abs(np.asarray(rule.moves)[:, 0]).max() > 1:
+                raise ValueError("Los movimientos por franjas no pueden saltar más de una fila")
+            rounds.append((current, rule))
+            current = []
+        else:
+            current.append(rule)
+    if current:
+        rounds.append((current, None))
+    return rounds
+
+
+# Tarea de una franja de gotas: inicializa sus filas con gotas de tamaño
+# normal(5, 2) con probabilidad prob
+def initialize_droplet_strip(grid_spec, r0, r1, prob, state):
+    rng = strip_generator(state)
+    grid = shared_array(grid_spec)
+    grid[r0:r1] = motor.random_grid((r1 - r0, grid.shape[1]), prob, rng=rng)
+    return rng.bit_generator.state
+
+
+# Tarea de una franja de gotas: aplica las reglas locales en su lugar y, si
+# hay movimiento, escribe las filas de la franja en la cuadrícula siguiente y
+# los aportes a las filas vecinas en halos[k] (arriba y abajo)
+def droplet_strip(k, grid_spec, next_spec, halos_spec, r0, r1, local_rules, movement, state):
+    rng = strip_generator(state)
+    grid = shared_array(grid_spec)
+    strip = grid[r0:r1]
+    for rule in local_rules:
+        strip = rule.apply(strip, rng)
+    if movement is None:
+        grid[r0:r1] = strip
+        return rng.bit_generator.state
+
+    rows, cols = grid.shape
+    moves = np.asarray(movement.moves)
+    cells = np.flatnonzero(strip > 0)
+    sizes = strip.ravel()[cells]
+    i, j = np.divmod(cells, cols)
+    i += r0
+    reach = np.abs(moves).max(axis=0)
+    border = np.flatnonzero((i < reach[0]) | (i >= rows - reach[0]) | (j < reach[1]) | (j >= cols - reach[1]))
+    chosen, can_move = motor.choose_droplet_moves(
+        sizes, border, i[border], j[border], rows, cols,
+        moves, movement.thresholds, movement.class_masks, rng,
+    )
+    # Índices en un bloque de (alto + 2) filas que empieza en la fila r0 - 1
+    targets = (i - r0 + 1 + moves[chosen, 0]) * cols + j + moves[chosen, 1]
+    height = r1 - r0 + 2
+    if can_move is not None:
+        targets[~can_move] = height * cols
+    block = np.bincount(targets, weights=sizes, minlength=height * cols + 1)[:-1].reshape(height, cols)
+
+    shared_array(next_spec)[r0:r1] = block[1:-1]
+    halos = shared_array(halos_spec)
+    halos[k, 0] = block[0]
+    halos[k, 1] = block[-1]
+    return rng.bit_generator.state
+
+
+# Tarea de una franja de gotas: decide las divisiones de sus gotas sobre la
+# cuadrícula de antes de dividir, que nadie escribe durante esta fase, y
+# escribe sus filas ya divididas en la cuadrícula siguiente. Las divisiones
+# cuyo trozo cae en una franja vecina quedan pendientes en splits[k] (arriba y
+# abajo, por columna de destino): el trozo, lo que queda en la gota y la
+# columna de la gota.
+def split_strip(k, grid_spec, next_spec, splits_spec, r0, r1, splitting, state):
+    rng = strip_generator(state)
+    grid = shared_array(grid_spec)
+    cols = grid.shape[1]
+    flat = grid.reshape(-1)
+    cells = r0 * cols + np.flatnonzero(grid[r0:r1] > splitting.threshold)
+    sources, targets, kept, fragments = motor.plan_splits(
+        cells, flat[cells], grid.shape, lambda targets: flat[targets] == 0,
+        splitting.prob, np.asarray(splitting.moves), splitting.collisions, rng,
+    )
+
+    strip = grid[r0:r1].copy()
+    inside = (targets >= r0 * cols) & (targets < r1 * cols)
+    strip.reshape(-1)[sources[inside] - r0 * cols] = kept[inside]
+    strip.reshape(-1)[targets[inside] - r0 * cols] = fragments[inside]
+    shared_array(next_spec)[r0:r1] = strip
+
+    pending = shared_array(splits_spec)[k]
+    pending[:] = 0
+    for side, outside in enumerate((targets < r0 * cols, targets >= r1 * cols)):
+        target_cols = targets[outside] % cols
+        pending[side, 0, target_cols] = fragments[outside]
+        pending[side, 1, target_cols] = kept[outside]
+        pending[side, 2, target_cols] = sources[outside] % cols
+    return rng.bit_generator.state
+
+
+# Tarea de una franja de nubes: actualiza las filas r0:r1 de los planos a
+# partir de una ventana con una fila de halo de cada vecina
+def cloud_strip(plane_specs, next_specs, cols, r0, r1, probabilities, state):
+    rng = strip_generator(state)
+    humidity, cloud, act = (shared_array(spec) for spec in plane_specs)
+    rows = humidity.shape[0]
+    w0, w1 = max(r0 - 1, 0), min(r1 + 1, rows)
+    window = np.s_[w0:w1]
+    valid = motor_nubes.valid_bits(humidity[window].shape, cols)
+    new_planes = motor_nubes.update_window(
+        humidity[window], cloud[window], act[window], valid, *probabilities, rng,
+    )
+    for spec, plane in zip(next_specs, new_planes):
+        shared_array(spec)[r0:r1] = plane[r0 - w0:r1 - w0]
+    return rng.bit_generator.state
+
+
+# Franjas de una cuadrícula compartida con su pool de procesos y el
+# generador de cada franja. Con workers=1 las tareas corren en este proceso.
+class StripPool:
+    def __init__(self, rows, n_strips=DEFAULT_STRIPS, workers=None, seed=None):
+        self.strips = strip_bounds(rows, min(n_strips, rows))
+        self.states = [rng.bit_generator.state for rng in aleatorio.child_generators(seed, len(self.strips))]
+        workers = min(len(self.strips), workers or os.cpu_count() or 1)
+        self.executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        self.blocks = []
+
+    def shared(self, shape, dtype):
+        block, spec = create_shared(shape, dtype)
+        self.blocks.append(block)
+        return spec
+
+    # Corre task(*args(k, r0, r1), estado) en cada franja y guarda los
+    # estados nuevos de los generadores
+    def run(self, task, args):
+        calls = [(*args(k, r0, r1), self.states[k]) for k, (r0, r1) in enumerate(self.strips)]
+        if self.executor is None:
+            self.states = [task(*call) for call in calls]
+        else:
+            self.states = list(self.executor.map(task, *zip(*calls)))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        for block in self.blocks:
+            attached.pop(block.name, None)
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# Cuadrícula de gotas repartida en franjas. grid es una vista de la
+# cuadrícula actual, válida hasta el paso siguiente.
+class DropletStrips(StripPool):
+    def __init__(self, shape, n_strips=DEFAULT_STRIPS, workers=None, seed=None):
+        super().__init__(shape[0], n_strips, workers, seed)
+        self.specs = [self.shared(shape, float), self.shared(shape, float)]
+        self.halos = self.shared((len(self.strips), 2, shape[1]), float)
+        self.splits = self.shared((len(self.strips), 2, 3, shape[1]), float)
+
+    @property
+    def grid(self):
+        return shared_array(self.specs[0])
+
+    # Llena la cuadrícula con gotas de tamaño normal(5, 2) con probabilidad prob
+    def initialize(self, prob):
+        self.run(initialize_droplet_strip, lambda k, r0, r1: (self.specs[0], r0, r1, prob))
+
+    # Avanza un paso con las reglas de un modelo (por ejemplo module.rules())
+    def step(self, rules):
+        shape = self.grid.shape
+        for local_rules, sync_rule in rule_rounds(rules):
+            movement = sync_rule if isinstance(sync_rule, motor.Movement) else None
+            if movement is not None or local_rules:
+                self.run(droplet_strip, lambda k, r0, r1: (
+                    k, self.specs[0], self.specs[1], self.halos, r0, r1,
+                    [rule for rule in (strip_rule(rule, r0, r1, shape) for rule in local_rules) if rule is not None],
+                    movement,
+                ))
+            if isinstance(sync_rule, motor.Splitting):
+                self.split(sync_rule)
+                continue
+            if movement is None:
+                continue
+            # Intercambio de halos: cada franja suma lo que le mandaron sus vecinas
+            new_grid, halos = shared_array(self.specs[1]), shared_array(self.halos)
+            for k, (r0, r1) in enumerate(self.strips):
+                if k > 0:
+                    new_grid[r0] += halos[k - 1, 1]
+                if k + 1 < len(self.strips):
+                    new_grid[r1 - 1] += halos[k + 1, 0]
+            self.specs.reverse()
+
+    # División en dos fases: cada franja divide sus gotas y la segunda fase
+    # escribe los trozos que cruzan a una franja vecina si su celda sigue vacía
+    def split(self, splitting):
+        self.run(split_strip, lambda k, r0, r1: (
+            k, self.specs[0], self.specs[1], self.splits, r0, r1, splitting,
+        ))
+        new_grid, pending = shared_array(self.specs[1]), shared_array(self.splits)
+        for k, (r0, r1) in enumerate(self.strips):
+            for side, (target_row, source_row) in enumerate(((r0 - 1, r0), (r1, r1 - 1))):
+                if not 0 <= target_row < new_grid.shape[0]:
+                    continue
+                target_cols = np.flatnonzero(pending[k, side, 0])
+                target_cols = target_cols[new_grid[target_row, target_cols] == 0]
+                new_grid[target_row, target_cols] = pending[k, side, 0, target_cols]
+                new_grid[source_row, pending[k, side, 2, target_cols].astype(np.intp)] = pending[k, side, 1, target_cols]
+        self.specs.reverse()
+
+
+# Planos de bits del autómata de nubes repartidos en franjas
+class CloudStrips(StripPool):
+    def __init__(self, planes, n_strips=DEFAULT_STRIPS, workers=None, seed=None):
+        super().__init__(planes.humidity.shape[0], n_strips, workers, seed)
+        self.cols = planes.cols
+        shape = planes.humidity.shape
+        self.specs = [[self.shared(shape, np.uint8) for _ in range(3)] for _ in range(2)]
+        for spec, plane in zip(self.specs[0], planes[:3]):
+            shared_array(spec)[:] = plane
+
+    @property
+    def planes(self):
+        return motor_nubes.CloudPlanes(*(shared_array(spec) for spec in self.specs[0]), self.cols)
+
+    def step(self, prob_extinction, prob_act, prob_spread):
+        probabilities = (prob_extinction, prob_act, prob_spread)
+        self.run(cloud_strip, lambda k, r0, r1: (self.specs[0], self.specs[1], self.cols, r0, r1, probabilities))
+        self.specs.reverse()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pasos en varios núcleos con franjas en memoria compartida")
+    parser.add_argument("script", help="Modelo: proyecto1 ... proyecto4Alex o proyecto5")
+    parser.add_argument("--grid-size", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--strips", type=int, default=DEFAULT_STRIPS, help="Número de franjas")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de los generadores de las franjas")
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.script)
+    shape = (args.grid_size, args.grid_size)
+    if hasattr(module, "rules"):
+        with DropletStrips(shape, args.strips, args.workers, args.seed) as pool:
+            pool.initialize(module.INITIAL_DROPLET_PROB)
+            start = time.perf_counter()
+            for time_step in range(args.steps):
+                pool.step(module.rules())
+            elapsed = time.perf_counter() - start
+            sizes = motor.droplet_sizes(pool.grid)
+            print(f"Gotas: {len(sizes)}, tamaño medio: {sizes.mean() if len(sizes) else 0.0:.3f}, "
+                  f"masa total: {sizes.sum():.1f}")
+    else:
+        planes = motor_nubes.initialize_planes(args.grid_size, rng=aleatorio.make_generator(args.seed))
+        probabilities = (module.PROB_EXTINCTION, module.PROB_ACT, module.HUMIDITY_SPREAD_PROB)
+        with CloudStrips(planes, args.strips, args.workers, args.seed) as pool:
+            start = time.perf_counter()
+            for time_step in range(args.steps):
+                pool.step(*probabilities)
+            elapsed = time.perf_counter() - start
+            cloud_count, humidity_count, act_count = motor_nubes.count_planes(pool.planes)
+            print(f"Nubes: {cloud_count}, humedad: {humidity_count}, act: {act_count}")
+    print(f"{args.grid_size}x{args.grid_size} en {len(pool.strips)} franjas: {args.steps / elapsed:.2f} pasos/s")
@@ -0,0 +1,177 @@
+import numpy as np
+
+import aleatorio
+import motor
+
+# Representación dispersa de un campo de gotas: en lugar de la cuadrícula
+# densa se guardan tres arreglos paralelos con la fila, la columna y el tamaño
+# de cada gota, ordenados por celda (en el orden de filas de la cuadrícula).
+# Con poca ocupación (proyecto4_v2 cuando las gotas ya cayeron, dominios
+# grandes casi vacíos) cada paso cuesta según el número de gotas y no según
+# el número de celdas. El movimiento se hace sobre los arreglos y la
+# coalescencia ordenando los índices lineales de las celdas de llegada con
+# np.unique y sumando los tamaños de cada una.
+#
+# Las operaciones sortean exactamente lo mismo y en el mismo orden que las
+# reglas densas de motor.py, así que con la misma semilla las dos
+# representaciones dan el mismo resultado y motor.apply_rules puede cambiar
+# de una a otra (adapt) sin que se note en las series.
+
+SPARSE_MIN_CELLS = 65536  # Cuadrículas más chicas (256x256) siempre son densas
+SPARSE_OCCUPANCY = 0.02  # Ocupación por debajo de la cual se pasa a partículas
+DENSE_OCCUPANCY = 0.05  # Ocupación por encima de la cual se vuelve a la cuadrícula
+
+
+# Gotas como arreglos paralelos (rows, cols, sizes) de una cuadrícula shape
+class Particles:
+    def __init__(self, rows, cols, sizes, shape):
+        self.rows = rows
+        self.cols = cols
+        self.sizes = sizes
+        self.shape = tuple(shape)
+
+    # Crea las partículas de una cuadrícula densa 2D
+    @classmethod
+    def from_grid(cls, grid):
+        flat = grid.ravel()
+        cells = np.flatnonzero(flat > 0)
+        rows, cols = np.divmod(cells, grid.shape[1])
+        return cls(rows, cols, flat[cells], grid.shape)
+
+    # Crea las partículas a partir de índices lineales de celda; las gotas que
+    # caen en la misma celda se unen sumando su tamaño
+    @classmethod
+    def from_cells(cls, cells, sizes, shape):
+        unique, inverse = np.unique(cells, return_inverse=True)
+        merged = np.bincount(inverse, weights=sizes, minlength=len(unique))
+        rows, cols = np.divmod(unique, shape[1])
+        return cls(rows, cols, merged, shape)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @property
+    def cells(self):
+        return self.rows * self.shape[1] + self.cols
+
+    @property
+    def occupancy(self):
+        return len(self.sizes) / (self.shape[0] * self.shape[1])
+
+    def to_grid(self):
+        grid = np.zeros(self.shape, dtype=float)
+        grid[self.rows, self.cols] = self.sizes
+        return grid
+
+    # Partículas con las gotas de cells (índices lineales libres y ordenados)
+    # agregadas en su lugar del orden
+    def insert(self, cells, sizes):
+        position = np.searchsorted(self.cells, cells)
+        rows, cols = np.divmod(cells, self.shape[1])
+        return Particles(
+            np.insert(self.rows, position, rows), np.insert(self.cols, position, cols),
+            np.insert(self.sizes, position, sizes), self.shape,
+        )
+
+    # Partículas sin las gotas de las posiciones removed
+    def remove(self, removed):
+        keep = np.ones(len(self.sizes), dtype=bool)
+        keep[removed] = False
+        return Particles(self.rows[keep], self.cols[keep], self.sizes[keep], self.shape)
+
+    # Movimiento y coalescencia (motor.Movement)
+    def move(self, moves, thresholds=None, class_masks=None, rng=None):
+        rows, cols = self.shape
+        reach = np.abs(moves).max(axis=0)
+        border = np.flatnonzero(
+            (self.rows < reach[0]) | (self.rows >= rows - reach[0])
+            | (self.cols < reach[1]) | (self.cols >= cols - reach[1])
+        )
+        chosen, can_move = motor.choose_droplet_moves(
+            self.sizes, border, self.rows[border], self.cols[border], rows, cols,
+            moves, thresholds, class_masks, rng,
+        )
+        new_rows = self.rows + moves[chosen, 0]
+        new_cols = self.cols + moves[chosen, 1]
+        sizes = self.sizes
+        if can_move is not None:
+            new_rows, new_cols, sizes = new_rows[can_move], new_cols[can_move], sizes[can_move]
+        return Particles.from_cells(new_rows * cols + new_cols, sizes, self.shape)
+
+    # Gotas nuevas en las celdas vacías (motor.EmptyCellSource). Se sortean
+    # posiciones entre las celdas vacías; la k-ésima celda vacía es la celda
+    # k más el número de gotas que la preceden.
+    def add_to_empty(self, prob, size, rng=None):
+        cells = self.cells
+        picks = motor.bernoulli_indices(self.shape[0] * self.shape[1] - len(cells), np.max(prob), rng)
+        if len(picks) == 0:
+            return self
+        added = picks + np.searchsorted(cells - np.arange(len(cells)), picks, side="right")
+        added = added[motor.field_mask(added, prob, self.shape, rng)]
+        return self.insert(added, np.full(len(added), float(size)))
+
+    # Gotas nuevas en la fila superior (motor.TopRowSource)
+    def add_to_top_row(self, prob, mean, std, min_size=1, rng=None):
+        rng = aleatorio.rng if rng is None else rng
+        columns = np.flatnonzero(rng.random(self.shape[1]) < prob)
+        values = np.maximum(min_size, rng.normal(mean, std, len(columns)))
+        if len(columns) == 0:
+            return self
+        # Las gotas de la fila 0 son las primeras; las celdas ocupadas se
+        # sobrescriben y las vacías se agregan
+        top = np.searchsorted(self.rows, 1)
+        position = np.searchsorted(self.cols[:top], columns)
+        occupied = position < top
+        occupied[occupied] = self.cols[position[occupied]] == columns[occupied]
+        sizes = self.sizes.copy()
+        sizes[position[occupied]] = values[occupied]
+        particles = Particles(self.rows, self.cols, sizes, self.shape)
+        return particles.insert(columns[~occupied], values[~occupied])
+
+    # Eliminación de gotas grandes (motor.LargeDropletSink)
+    def remove_large(self, prob, threshold, rng=None):
+        large = np.flatnonzero(self.sizes > threshold)
+        removed = large[motor.bernoulli_indices(len(large), np.max(prob), rng)]
+        removed = removed[motor.field_mask(self.cells[removed], prob, self.shape, rng)]
+        return self.remove(removed) if len(removed) else self
+
+    # División de gotas grandes (motor.Splitting); las celdas vacías se
+    # buscan en el arreglo ordenado de celdas ocupadas
+    def split(self, threshold, prob, moves, collisions="random", rng=None):
+        cells = self.cells
+        large = np.flatnonzero(self.sizes > threshold)
+
+        def is_empty(targets):
+            position = np.minimum(np.searchsorted(cells, targets), len(cells) - 1)
+            return cells[position] != targets
+
+        sources, targets, kept, fragments = motor.plan_splits(
+            cells[large], self.sizes[large], self.shape, is_empty, prob, moves, collisions, rng,
+        )
+        if len(sources) == 0:
+            return self
+        sizes = self.sizes.copy()
+        sizes[np.searchsorted(cells, sources)] = kept
+        order = np.argsort(targets)
+        return Particles(self.rows, self.cols, sizes, self.shape).insert(targets[order], fragments[order])
+
+
+# Función que devuelve la cuadrícula densa de un estado: una cuadrícula, unas
+# partículas o cualquier otro estado con to_grid (por ejemplo los planos de
+# motor_nubes.FrontierState)
+def as_grid(state):
+    return state.to_grid() if hasattr(state, "to_grid") else state
+
+
+# Función para elegir la representación del siguiente paso según la
+# ocupación. Los umbrales son distintos para ir y volver, así que un campo
+# cerca del límite no cambia de representación en cada paso. Sólo se usan
+# partículas para cuadrículas 2D de al menos SPARSE_MIN_CELLS celdas.
+def adapt(state):
+    if isinstance(state, Particles):
+        return state.to_grid() if state.occupancy > DENSE_OCCUPANCY else state
+    if state.ndim != 2 or state.size < SPARSE_MIN_CELLS or state.dtype.names is not None:
+        return state
+    if np.count_nonzero(state) < SPARSE_OCCUPANCY * state.size:
+        return Particles.from_grid(state)
+    return state
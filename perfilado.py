@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# Perfilado por fases del bucle principal. Cada fase (move_droplets,
+# add_small_droplets, split_large_droplets, estadísticas, draw_grid, ...) se
+# envuelve con perfilado.phase(nombre); con el perfilado apagado eso es un
+# contexto vacío, así que el costo es despreciable. Con el perfilado
+# encendido se guardan las últimas WINDOW duraciones de cada fase para sacar
+# percentiles móviles y, si se pide, los eventos para un archivo de traza de
+# Chrome (chrome://tracing o https://ui.perfetto.dev).
+#
+# En la ventana, la tecla P enciende o apaga el perfilado y la tecla O muestra
+# u oculta el panel con ms por fase, pasos por segundo y cuadros por segundo.
+
+WINDOW = 240  # Muestras por fase para los percentiles móviles
+MAX_TRACE_EVENTS = 1_000_000  # Límite de eventos guardados para la traza
+OVERLAY_FONT_SIZE = 18
+OVERLAY_COLOR = (255, 255, 0)
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+
+NULL_PHASE = nullcontext()
+
+
+# Medición de una fase; al salir del bloque registra la duración
+class Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+        return False
+
+
+# Perfilador con duraciones por fase y contadores de eventos (pasos, cuadros)
+class PhaseProfiler:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = False
+        self.overlay = False
+        self.tracing = False
+        self.durations = {}  # nombre -> deque de duraciones en segundos
+        self.ticks = {}  # nombre -> deque de instantes, para calcular tasas
+        self.trace = []
+        self.origin = time.perf_counter()
+        self.font = None
+
+    def phase(self, name):
+        return Phase(self, name) if self.enabled else NULL_PHASE
+
+    def add(self, name, start, end):
+        samples = self.durations.get(name)
+        if samples is None:
+            samples = self.durations.setdefault(name, deque(maxlen=self.window))
+        samples.append(end - start)
+        if self.tracing and len(self.trace) < MAX_TRACE_EVENTS:
+            self.trace.append((name, start, end, threading.get_ident()))
+
+    # Registra un evento (por ejemplo "paso" o "cuadro") para medir su tasa
+    def tick(self, name):
+        if not self.enabled:
+            return
+        ticks = self.ticks.get(name)
+        if ticks is None:
+            ticks = self.ticks.setdefault(name, deque(maxlen=self.window))
+        ticks.append(time.perf_counter())
+
+    # Eventos por segundo en la ventana móvil
+    def rate(self, name):
+        ticks = self.ticks.get(name)
+        if not ticks or len(ticks) < 2:
+            return 0.0
+        elapsed = ticks[-1] - ticks[0]
+        return (len(ticks) - 1) / elapsed if elapsed > 0 else 0.0
+
+    # Percentiles en milisegundos de las últimas duraciones de una fase
+    def percentiles(self, name, q=(50, 90, 99)):
+        samples = self.durations.get(name)
+        if not samples:
+            return {}
+        values = np.percentile(np.fromiter(samples, float), q) * 1e3
+        return {f"p{p}": float(value) for p, value in zip(q, values)}
+
+    def summary(self):
+        return {
+            "phases_ms": {name: self.percentiles(name) for name in list(self.durations)},
+            "rates": {name: self.rate(name) for name in list(self.ticks)},
+        }
+
+    def reset(self):
+        self.durations.clear()
+        self.ticks.clear()
+        self.trace.clear()
+
+    # Guarda la traza en el formato JSON de eventos de Chrome
+    def write_trace(self, path):
+        pid = os.getpid()
+        events = [
+            {"name": name, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+            for name, start, end, tid in list(self.trace)
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    # Atiende las teclas P (perfilado) y O (panel) de la ventana
+    def handle_event(self, event):
+        import pygame
+
+        if event.type != pygame.KEYDOWN:
+            return
+        if event.key == pygame.K_p:
+            self.enabled = not self.enabled
+        elif event.key == pygame.K_o:
+            self.overlay = not self.overlay
+            self.enabled = self.enabled or self.overlay
+
+    # Dibuja el panel con ms por fase (p50 / p90), pasos/s y cuadros/s
+    def draw_overlay(self, screen):
+        if not self.overlay:
+            return
+        import pygame
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        lines = [f"pasos/s {self.rate('paso'):7.1f}   FPS {self.rate('cuadro'):5.1f}"]
+        for name in list(self.durations):
+            stats = self.percentiles(name, (50, 90))
+            lines.append(f"{name:22s} {stats['p50']:7.3f} ms  p90 {stats['p90']:7.3f}")
+        surfaces = [self.font.render(line, True, OVERLAY_COLOR) for line in lines]
+        width = max(surface.get_width() for surface in surfaces) + 8
+        height = sum(surface.get_height() for surface in surfaces) + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(OVERLAY_BACKGROUND)
+        y = 4
+        for surface in surfaces:
+            panel.blit(surface, (4, y))
+            y += surface.get_height()
+        screen.blit(panel, (0, 0))
+
+
+# Perfilador del programa; los scripts y los bucles de ejecución lo usan
+# mediante las funciones de abajo
+profiler = PhaseProfiler()
+
+
+def phase(name):
+    return profiler.phase(name)
+
+
+def tick(name):
+    profiler.tick(name)
+
+
+# Función para encender el perfilado (y la traza si se da un archivo)
+def enable(overlay=False, trace=False):
+    profiler.enabled = True
+    profiler.overlay = overlay
+    profiler.tracing = trace
+
+
+# Función para mostrar los percentiles de cada fase en la consola
+def print_summary():
+    summary = profiler.summary()
+    for name, stats in summary["phases_ms"].items():
+        if stats:
+            print(f"{name:22s} p50 {stats['p50']:8.3f} ms  p90 {stats['p90']:8.3f} ms  p99 {stats['p99']:8.3f} ms")
+    for name, rate in summary["rates"].items():
+        print(f"{name}/s: {rate:.1f}")
@@ -1,25 +1,38 @@
-import pygame
+import sys
+
 import numpy as np
-import random
-import matplotlib.pyplot as plt
+
+import aleatorio
+import compilado
+import ejecucion
+import graficos
+import motor_nubes
+import particulas
+import perfilado
+import render
 
 # Configuración
 GRID_SIZE = 80  # Dimensiones de la cuadrícula (50x50)
 CELL_SIZE = 10  # Tamaño en píxeles de cada celda
 FPS = 5  # Cuadros por segundo
+MAX_TIME_STEPS = 200  # Número de pasos de simulación
 
 # Probabilidades
 PROB_HUMIDITY = 0.05  # Probabilidad de que una celda sin nube gane suficiente humedad
 PROB_EXTINCTION = 0.02  # Probabilidad de que una celda de nube pierda su estado de nube
 PROB_ACT = 0.03  # Probabilidad de que una celda se vuelva lista para transicionar
-
-# Inicialización de PyGame
-pygame.init()
-WIDTH = GRID_SIZE * CELL_SIZE
-HEIGHT = GRID_SIZE * CELL_SIZE
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Simulación 2D de Evolución de Nubes")
-clock = pygame.time.Clock()
+HUMIDITY_SPREAD_PROB = 0.2  # Probabilidad de expansión de humedad desde un vecino húmedo
+USE_NUMPY_ENGINE = True  # Usar el motor de planos de bits (motor_nubes.py)
+ACTIVE_FRONTIER = False  # Conservar los planos de bits entre pasos y actualizar sólo los bloques activos
+FAST_RENDER = True  # Dibujar con render.py (surfarray) en lugar de un rect por celda
+STEADY_STATE_TOLERANCE = None  # Tolerancia relativa para terminar al llegar al estado estacionario (None: todos los pasos)
+PLOT_AT_END = True  # Graficar los resultados al cerrar la simulación interactiva
+KEEP_WINDOW_OPEN = True  # Dejar la ventana abierta con el último paso hasta cerrarla
+
+# Ventana de PyGame (la crea ejecucion.init_display, no al importar el módulo)
+CAPTION = "Simulación 2D de Evolución de Nubes"
+screen = None
+clock = None
 
 # Colores
 BACKGROUND_COLOR = (30, 30, 30)
@@ -39,13 +52,21 @@ def initialize_grid():
     for i in range(center_x - radius, center_x + radius + 1):
         for j in range(center_y - radius, center_y + radius + 1):
             if 0 <= i < GRID_SIZE and 0 <= j < GRID_SIZE:
-                if random.random() < initial_humidity_prob:
+                if aleatorio.rng.random() < initial_humidity_prob:
                     grid[i][j]['humidity'] = True
 
     return grid
 
 # Función para dibujar la cuadrícula
 def draw_grid(grid):
+    import pygame
+
+    grid = particulas.as_grid(grid)
+    if FAST_RENDER:
+        palette = [BACKGROUND_COLOR, HUMIDITY_COLOR, ACT_COLOR, CLOUD_COLOR]
+        render.blit_rgb(screen, render.state_rgb(grid, palette), CELL_SIZE)
+        return
+
     screen.fill(BACKGROUND_COLOR)
     for i in range(GRID_SIZE):
         for j in range(GRID_SIZE):
@@ -57,8 +78,21 @@ def draw_grid(grid):
             elif grid[i][j]['humidity']:
                 pygame.draw.rect(screen, HUMIDITY_COLOR, (x, y, CELL_SIZE, CELL_SIZE))
 
-# Función para actualizar la cuadrícula según las reglas
+# Función para actualizar la cuadrícula según las reglas. Con ACTIVE_FRONTIER
+# el estado entre pasos es un motor_nubes.FrontierState y no la cuadrícula.
 def update_grid(grid):
+    if ACTIVE_FRONTIER:
+        if not isinstance(grid, motor_nubes.FrontierState):
+            grid = motor_nubes.FrontierState.from_grid(grid)
+        return grid.step(PROB_EXTINCTION, PROB_ACT, HUMIDITY_SPREAD_PROB)
+    grid = particulas.as_grid(grid)
+    if compilado.enabled():
+        return compilado.update_cloud_grid(grid, PROB_EXTINCTION, PROB_ACT, HUMIDITY_SPREAD_PROB)
+    if USE_NUMPY_ENGINE:
+        planes = motor_nubes.pack_grid(grid)
+        planes = motor_nubes.update_planes(planes, PROB_EXTINCTION, PROB_ACT, HUMIDITY_SPREAD_PROB)
+        return motor_nubes.unpack_grid(planes)
+
     new_grid = grid.copy()
     for i in range(GRID_SIZE):
         for j in range(GRID_SIZE):
@@ -78,7 +112,7 @@ def update_grid(grid):
                     new_grid[i][j]['act'] = True
 
             # Regla 4: Si cloud es verdadero, con probabilidad probExtinction, se vuelve falso
-            if cell['cloud'] and random.random() < PROB_EXTINCTION:
+            if cell['cloud'] and aleatorio.rng.random() < PROB_EXTINCTION:
                 new_grid[i][j]['cloud'] = False
 
             # Regla 5: Con probabilidad probAct, act se vuelve verdadero
@@ -86,14 +120,14 @@ def update_grid(grid):
             if not cell['act']:
                 neighbors = get_neighbors(grid, i, j)
                 if any(neighbor['humidity'] or neighbor['act'] for neighbor in neighbors):
-                    if random.random() < PROB_ACT:
+                    if aleatorio.rng.random() < PROB_ACT:
                         new_grid[i][j]['act'] = True
 
             # Expansión de humedad con el tiempo desde los vecinos
             if not cell['humidity']:
                 neighbors = get_neighbors(grid, i, j)
                 if any(neighbor['humidity'] for neighbor in neighbors):
-                    if random.random() < 0.2:  # Probabilidad de expansión
+                    if aleatorio.rng.random() < HUMIDITY_SPREAD_PROB:  # Probabilidad de expansión
                         new_grid[i][j]['humidity'] = True
 
     return new_grid
@@ -109,13 +143,19 @@ def get_neighbors(grid, x, y):
 
 # Recopilar datos sobre los estados de las nubes, la humedad y act
 def collect_data(grid):
+    if isinstance(grid, motor_nubes.FrontierState):
+        return motor_nubes.count_planes(grid.planes)
     cloud_count = np.sum(grid['cloud'])
     humidity_count = np.sum(grid['humidity'])
     act_count = np.sum(grid['act'])
     return cloud_count, humidity_count, act_count
 
 # Graficar resultados
-def plot_results(time_steps, cloud_counts, humidity_counts, act_counts):
+def plot_results(results, output_dir=None):
+    plt = graficos.pyplot(output_dir)
+    time_steps, cloud_counts = results["time_steps"], results["cloud_counts"]
+    humidity_counts, act_counts = results["humidity_counts"], results["act_counts"]
+
     # Gráfico 1: Evolución de las cantidades de células
     plt.figure(figsize=(10, 6))
     plt.plot(time_steps, cloud_counts, label='Celdas de Nubes', color='gray')
@@ -126,14 +166,14 @@ def plot_results(time_steps, cloud_counts, humidity_counts, act_counts):
     plt.ylabel("Cantidad de células")
     plt.legend()
     plt.grid()
-    plt.show()
+    graficos.show(plt, output_dir, "proyecto5_evolucion")
 
     # Gráfico 2: Histograma final de las células nubladas
     plt.figure(figsize=(10, 6))
     plt.bar(['Nubes', 'Humedad', 'Act'], [cloud_counts[-1], humidity_counts[-1], act_counts[-1]], color=['gray', 'blue', 'orange'])
     plt.title("Distribución final de estados de células")
     plt.ylabel("Cantidad")
-    plt.show()
+    graficos.show(plt, output_dir, "proyecto5_distribucion_final")
 
     # Gráfico 3: Relación entre células de humedad y activadas
     plt.figure(figsize=(10, 6))
@@ -142,59 +182,21 @@ def plot_results(time_steps, cloud_counts, humidity_counts, act_counts):
     plt.xlabel("Humedad")
     plt.ylabel("Act")
     plt.grid()
-    plt.show()
-
-# Simulación principal
-def main():
-    grid = initialize_grid()
-    running = True
-    time_step = 0
-
-    # Recopilación de datos
-    time_steps = []
-    cloud_counts = []
-    humidity_counts = []
-    act_counts = []
-
-    # Bucle de simulación
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        # Actualizar la cuadrícula
-        grid = update_grid(grid)
-
-        # Recopilar datos
-        cloud_count, humidity_count, act_count = collect_data(grid)
-        time_steps.append(time_step)
-        cloud_counts.append(cloud_count)
-        humidity_counts.append(humidity_count)
-        act_counts.append(act_count)
-
-        # Dibujar la cuadrícula
-        draw_grid(grid)
-        pygame.display.flip()
-
-        # Controlar la velocidad de fotogramas
-        clock.tick(FPS)
-        time_step += 1
-
-        if time_step >= 200:  # Detener después de 200 pasos
-            running = False
-
-    # Graficar resultados
-    plot_results(time_steps, cloud_counts, humidity_counts, act_counts)
-
-    # Mantener la visualización activa
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return
-
-        draw_grid(grid)
-        pygame.display.flip()
+    graficos.show(plt, output_dir, "proyecto5_humedad_vs_act")
+
+# Función con un paso completo de la simulación (sin visualización)
+def simulation_step(grid):
+    with perfilado.phase("update_grid"):
+        return update_grid(grid)
+
+# Función con los datos que se recolectan en cada paso
+def collect_step(grid):
+    cloud_count, humidity_count, act_count = collect_data(grid)
+    return {
+        "cloud_counts": cloud_count,
+        "humidity_counts": humidity_count,
+        "act_counts": act_count,
+    }
 
 if __name__ == "__main__":
-    main()
+    ejecucion.run_cli(sys.modules[__name__], "Simulación 2D de evolución de nubes")
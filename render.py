@@ -0,0 +1,140 @@
+from functools import lru_cache
+
+import numpy as np
+
+import particulas
+
+# Renderizado rápido de las cuadrículas: en lugar de un pygame.draw.rect por
+# celda, se calcula el color de todas las celdas con una tabla de colores, se
+# escribe en una superficie de una celda por píxel con pygame.surfarray y se
+# escala a la ventana con una sola llamada a pygame.transform.scale. pygame
+# se importa dentro de las funciones que dibujan, así que calcular colores no
+# lo carga.
+
+CELESTE = np.array([173, 216, 230])  # Color de las gotas más pequeñas
+BLUE = np.array([0, 0, 255])  # Color de las gotas más grandes
+LUT_LEVELS = 1024  # Resolución de la tabla de colores por tamaño
+MIN_LABEL_CELL_SIZE = 18  # Con celdas más chicas la fuente (CELL_SIZE // 3) no se lee
+LABEL_CACHE_SIZE = 4096  # Máximo de etiquetas renderizadas guardadas por fuente y color
+
+# Superficies pequeñas reutilizadas entre cuadros, por tamaño de cuadrícula
+small_surfaces = {}
+
+# Cachés de etiquetas renderizadas, una por (fuente, color)
+label_renderers = {}
+
+
+# Función para precalcular la tabla celeste -> azul de color_for_size
+def size_color_lut(levels=LUT_LEVELS):
+    normalized_size = np.linspace(0, 1, levels)[:, None]
+    color = CELESTE * (1 - normalized_size) + BLUE * normalized_size
+    return color.astype(np.uint8)
+
+
+SIZE_LUT = size_color_lut()
+
+
+# Función para interpolar el color de una gota entre celeste y azul
+def color_for_size(droplet_size, max_size):
+    normalized_size = np.clip(droplet_size / max_size, 0, 1)
+    color = CELESTE * (1 - normalized_size) + BLUE * normalized_size
+    return tuple(color.astype(int))
+
+
+# Función para calcular el color RGB de todas las celdas de gotas a la vez.
+# Las celdas vacías quedan con el color de fondo y, si se da ground_color, la
+# última fila se pinta como suelo (proyecto4_v2 / proyecto4Alex).
+def droplet_rgb(grid, max_size, background, ground_color=None):
+    normalized_size = np.clip(grid / max_size, 0, 1)
+    index = (normalized_size * (LUT_LEVELS - 1)).astype(np.intp)
+    rgb = SIZE_LUT[index]
+    rgb[grid <= 0] = background
+    if ground_color is not None:
+        rgb[-1] = ground_color
+    return rgb
+
+
+# Función para calcular el color RGB del autómata de nubes de proyecto5.
+# palette tiene los colores de fondo, humedad, act y nube, en ese orden; la
+# nube tiene prioridad sobre act y act sobre humedad, como en draw_grid.
+def state_rgb(grid, palette):
+    state = np.zeros(grid.shape, dtype=np.intp)
+    state[grid["humidity"]] = 1
+    state[grid["act"]] = 2
+    state[grid["cloud"]] = 3
+    return np.asarray(palette, dtype=np.uint8)[state]
+
+
+# Función para dibujar un arreglo RGB (filas, columnas, 3) en la pantalla,
+# escalando cada celda a cell_size x cell_size píxeles
+def blit_rgb(screen, rgb, cell_size):
+    import pygame
+
+    rows, cols = rgb.shape[:2]
+    small = small_surfaces.get((cols, rows))
+    if small is None:
+        small = pygame.Surface((cols, rows))
+        small_surfaces[(cols, rows)] = small
+    # surfarray indexa por (x, y), es decir (columna, fila)
+    pygame.surfarray.blit_array(small, rgb.swapaxes(0, 1))
+
+    size = (cols * cell_size, rows * cell_size)
+    if screen.get_size() == size:
+        pygame.transform.scale(small, size, screen)
+    else:
+        screen.blit(pygame.transform.scale(small, size), (0, 0))
+
+
+# Función que devuelve un renderizador de etiquetas con caché LRU: cada texto
+# distinto se rasteriza una sola vez y luego se reutiliza la superficie
+def label_renderer(font, color):
+    renderer = label_renderers.get((font, color))
+    if renderer is None:
+        @lru_cache(maxsize=LABEL_CACHE_SIZE)
+        def renderer(text):
+            surface = font.render(text, True, color)
+            return surface, surface.get_width() // 2, surface.get_height() // 2
+
+        label_renderers[(font, color)] = renderer
+    return renderer
+
+
+# Función para escribir el tamaño de cada gota encima de su celda. Con celdas
+# menores que MIN_LABEL_CELL_SIZE las etiquetas no se dibujan.
+def draw_labels(screen, grid, font, cell_size, color):
+    if cell_size < MIN_LABEL_CELL_SIZE:
+        return
+    render_label = label_renderer(font, color)
+    rows, cols = np.nonzero(grid > 0)
+    centers_y = (rows * cell_size + cell_size // 2).tolist()
+    centers_x = (cols * cell_size + cell_size // 2).tolist()
+    blits = []
+    for size, x, y in zip(grid[rows, cols].tolist(), centers_x, centers_y):
+        text, half_width, half_height = render_label(f"{size:.1f}")
+        blits.append((text, (x - half_width, y - half_height)))
+    screen.blits(blits, doreturn=False)
+
+
+# Función para dibujar una cuadrícula de gotas con sus etiquetas. Con
+# ground_color la última fila es el suelo y no lleva etiquetas. Con fast=False
+# se dibuja un pygame.draw.rect por celda, como los scripts originales, sobre
+# una pantalla ya rellenada con el color de fondo. grid puede ser también un
+# estado disperso de particulas.py.
+def draw_droplets(screen, grid, font, cell_size, max_size, background, text_color, ground_color=None, fast=True):
+    grid = particulas.as_grid(grid)
+    labeled = grid if ground_color is None else grid[:-1]
+    if fast:
+        blit_rgb(screen, droplet_rgb(grid, max_size, background, ground_color), cell_size)
+        draw_labels(screen, labeled, font, cell_size, text_color)
+        return
+
+    import pygame
+
+    rows, cols = grid.shape
+    if ground_color is not None:
+        pygame.draw.rect(screen, ground_color, (0, (rows - 1) * cell_size, cols * cell_size, cell_size))
+    for i, j in zip(*np.nonzero(labeled > 0)):
+        droplet_size = labeled[i, j]
+        pygame.draw.rect(screen, color_for_size(droplet_size, max_size), (j * cell_size, i * cell_size, cell_size, cell_size))
+        text = font.render(f"{droplet_size:.1f}", True, text_color)
+        screen.blit(text, text.get_rect(center=(j * cell_size + cell_size // 2, i * cell_size + cell_size // 2)))
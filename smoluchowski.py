@@ -0,0 +1,248 @@
+import argparse
+import importlib
+import math
+import time
+
+import numpy as np
+
+import aleatorio
+import ejecucion
+import motor
+
+# Modelo de campo medio (ecuación de coagulación de Smoluchowski en tiempo
+# discreto) para la distribución de tamaños de los modelos de gotas. En lugar
+# de mover cada gota se sigue n[k], el número medio de gotas de tamaño
+# (k + 1) * BIN_WIDTH por celda, y cada paso cuesta una convolución de
+# N_BINS elementos, sin importar el tamaño de la cuadrícula. Sirve para
+# explorar parámetros antes de correr la simulación espacial.
+#
+# Las reglas se traducen desde module.rules():
+# - Movement: coalescencia con núcleo constante kernel (las gotas de tamaños
+#   i y j se unen a razón de kernel * n[i] * n[j] por celda y paso) y, para
+#   las clases que sólo pueden caer, salida por el suelo a razón de
+#   1 / filas. Con gotas nuevas en toda la cuadrícula (EmptyCellSource) la
+#   densidad de las que caen crece linealmente hacia abajo y la última fila
+#   tiene el doble de la media, así que la salida es 2 / filas.
+# - EmptyCellSource: gotas de tamaño size en la fracción vacía de las celdas.
+# - TopRowSource: gotas normal(mean, std) en la fila superior, o sea prob /
+#   filas por celda.
+# - LargeDropletSink: las gotas mayores que el umbral desaparecen con prob.
+# - Splitting: las gotas mayores que el umbral se parten con prob si algún
+#   vecino está vacío; el trozo que queda es uniforme en (1, tamaño - 1).
+# Los campos de probabilidades se reemplazan por su media. El núcleo no sale
+# de las reglas: se ajusta con calibrate contra corridas cortas de la
+# cuadrícula.
+
+BIN_WIDTH = 1.0  # Diferencia de tamaño entre dos clases
+N_BINS = 256  # Clases de tamaño; las gotas mayores se acumulan en la última
+DEFAULT_KERNEL = 0.64  # Núcleo de coalescencia calibrado con proyecto2 (200 pasos, semillas 0-2)
+QUADRATURE_POINTS = 4096  # Puntos para discretizar las distribuciones normales
+NEGLIGIBLE = 1e-30  # Densidades menores se ponen en cero (evita números subnormales, que son lentos)
+
+
+# Función para repartir gotas de tamaños continuos entre las dos clases
+# vecinas conservando el número y la masa. Devuelve n por clase.
+def bin_sizes(sizes, weights, n_bins=N_BINS, bin_width=BIN_WIDTH):
+    position = np.clip(np.asarray(sizes, dtype=float) / bin_width - 1, 0, n_bins - 1)
+    lower = np.minimum(np.floor(position).astype(np.intp), n_bins - 2)
+    upper_share = position - lower
+    n = np.bincount(lower, weights=weights * (1 - upper_share), minlength=n_bins)
+    n += np.bincount(lower + 1, weights=weights * upper_share, minlength=n_bins)
+    return n
+
+
+# Función con la distribución por clase de max(min_size, normal(mean, std))
+# para una gota (suma 1)
+def normal_sizes(mean, std, min_size=1, n_bins=N_BINS, bin_width=BIN_WIDTH):
+    edges = np.linspace(mean - 6 * std, mean + 6 * std, QUADRATURE_POINTS + 1)
+    cdf = np.array([0.5 * (1 + math.erf((edge - mean) / (std * math.sqrt(2)))) for edge in edges])
+    sizes = np.maximum(min_size, (edges[:-1] + edges[1:]) / 2)
+    n = bin_sizes(sizes, np.diff(cdf), n_bins, bin_width)
+    return n / n.sum()
+
+
+# Solucionador de campo medio para las reglas de un modelo de gotas
+class Solver:
+    def __init__(self, rules, rows, initial_prob, kernel=DEFAULT_KERNEL, initial_mean=5, initial_std=2,
+                 n_bins=N_BINS, bin_width=BIN_WIDTH):
+        self.kernel = kernel
+        self.rows = rows
+        self.bin_width = bin_width
+        self.sizes = (np.arange(n_bins) + 1) * bin_width
+        self.n = initial_prob * normal_sizes(initial_mean, initial_std, 1, n_bins, bin_width)
+        self.time_step = 0
+        self.ground_rows = 2 if any(isinstance(rule, motor.EmptyCellSource) for rule in rules) else 1
+        self.operators = [self.operator(rule) for rule in rules]
+
+    # Crea el solucionador de un script (proyecto1 a proyecto4Alex) con sus
+    # constantes: reglas, GRID_SIZE e INITIAL_DROPLET_PROB
+    @classmethod
+    def from_module(cls, module, kernel=DEFAULT_KERNEL, **options):
+        return cls(module.rules(), module.GRID_SIZE, module.INITIAL_DROPLET_PROB, kernel, **options)
+
+    @property
+    def occupancy(self):
+        return min(self.n.sum(), 1.0)
+
+    # Función que traduce una regla en una función n -> n
+    def operator(self, rule):
+        if isinstance(rule, motor.Movement):
+            return self.movement_operator(rule)
+        if isinstance(rule, motor.EmptyCellSource):
+            added = bin_sizes([rule.size], [1.0], len(self.sizes), self.bin_width)
+            prob = float(np.mean(rule.prob))
+            return lambda n: n + prob * (1 - min(n.sum(), 1.0)) * added
+        if isinstance(rule, motor.TopRowSource):
+            added = float(np.mean(rule.prob)) / self.rows * normal_sizes(
+                rule.mean, rule.std, rule.min_size, len(self.sizes), self.bin_width,
+            )
+            # Las gotas de la fila superior se reemplazan por las nuevas
+            replaced = float(np.mean(rule.prob)) / self.rows
+            return lambda n: n * (1 - replaced) + added
+        if isinstance(rule, motor.LargeDropletSink):
+            survival = np.where(self.sizes > rule.threshold, 1 - float(np.mean(rule.prob)), 1.0)
+            return lambda n: n * survival
+        if isinstance(rule, motor.Splitting):
+            return self.splitting_operator(rule)
+        raise ValueError(f"El modelo de campo medio no conoce la regla {type(rule).__name__}")
+
+    def movement_operator(self, rule):
+        moves = np.asarray(rule.moves)
+        thresholds = [] if rule.thresholds is None else rule.thresholds
+        masks = np.ones((1, len(moves)), bool) if rule.class_masks is None else np.asarray(rule.class_masks, bool)
+        # Clases que sólo pueden bajar: salen por el suelo desde la última fila
+        falls = np.array([len(moves[mask]) == 0 or (moves[mask, 0] > 0).all() for mask in masks])
+        exit_rate = np.where(falls[motor.size_classes(self.sizes, thresholds)], self.ground_rows / self.rows, 0.0)
+        last = len(self.sizes) - 1
+
+        def apply(n):
+            collisions = self.kernel * n
+            # Pares (i, j): la gota de tamaño (i + 1) + (j + 1) va a la clase i + j + 1
+            gain = 0.5 * np.convolve(collisions, n)
+            new_n = n - collisions * n.sum()
+            new_n[1:] += gain[:last]
+            # Las uniones que pasan de la última clase se acumulan en ella con su masa
+            overflow_mass = np.dot(gain[last:], np.arange(last, len(gain)) + 2)
+            new_n[last] += overflow_mass / (last + 1)
+            new_n *= 1 - exit_rate
+            new_n[new_n < NEGLIGIBLE] = 0
+            return new_n
+
+        return apply
+
+    def splitting_operator(self, rule):
+        prob = float(np.mean(rule.prob))
+        splittable = self.sizes > rule.threshold
+        # fragments[k] es la distribución de los dos trozos de una gota de la
+        # clase k: uno uniforme en (1, tamaño - 1) y el otro su complemento
+        fragments = np.zeros((len(self.sizes), len(self.sizes)))
+        for k in np.flatnonzero(splittable):
+            kept = np.linspace(1, self.sizes[k] - 1, 64)
+            weights = np.full(len(kept), 1 / len(kept))
+            fragments[k] = bin_sizes(np.concatenate([kept, self.sizes[k] - kept]), np.concatenate([weights, weights]),
+                                     len(self.sizes), self.bin_width)
+
+        def apply(n):
+            # Hace falta un vecino vacío de los cuatro
+            split = prob * (1 - min(n.sum(), 1.0) ** 4) * n * splittable
+            return n - split + split @ fragments
+
+        return apply
+
+    def step(self):
+        for operator in self.operators:
+            self.n = operator(self.n)
+        self.time_step += 1
+
+    # Estadísticas de la distribución para una cuadrícula de cells celdas,
+    # con los mismos nombres que estadisticas.StreamingStats
+    def statistics(self, cells):
+        count = self.n.sum()
+        mass = np.dot(self.n, self.sizes)
+        return {
+            "average_sizes": mass / count if count > 0 else 0.0,
+            "droplet_counts": count * cells,
+            "total_mass": mass * cells,
+        }
+
+    # Corre steps pasos y devuelve las series por paso y la distribución final
+    def run(self, steps):
+        cells = self.rows * self.rows
+        results = {"time_steps": list(range(self.time_step, self.time_step + steps))}
+        series = {}
+        for _ in range(steps):
+            self.step()
+            for name, value in self.statistics(cells).items():
+                series.setdefault(name, []).append(float(value))
+        results.update(series)
+        results["final_size_distribution"] = (self.n * cells).tolist()
+        results["size_bin_centers"] = self.sizes.tolist()
+        return results
+
+
+# Función con el error de un núcleo contra las series medias de la
+# cuadrícula: suma de los cuadrados de los logaritmos de los cocientes del
+# número de gotas y del tamaño medio en los pasos registrados
+def fit_error(module, kernel, reference):
+    results = Solver.from_module(module, kernel).run(reference["time_steps"][-1] + 1)
+    error = 0.0
+    for name in ("droplet_counts", "average_sizes"):
+        model = np.array(results[name])[reference["time_steps"]]
+        error += np.sum(np.log(np.maximum(model, 1e-12) / np.maximum(reference[name], 1e-12)) ** 2)
+    return float(error)
+
+
+# Función para ajustar el núcleo de coalescencia a corridas cortas de la
+# cuadrícula (con las semillas seeds) por búsqueda de la sección áurea sobre
+# log(kernel). Devuelve el núcleo, su error y las series de referencia.
+def calibrate(script, steps=200, seeds=(0, 1, 2), bounds=(1e-3, 10.0), iterations=40):
+    module = importlib.import_module(script)
+    runs = []
+    for seed in seeds:
+        aleatorio.seed(seed)
+        runs.append(ejecucion.run_model(module, steps))
+    reference = {"time_steps": runs[0]["time_steps"]}
+    for name in ("droplet_counts", "average_sizes"):
+        reference[name] = np.mean([run[name] for run in runs], axis=0)
+
+    ratio = (math.sqrt(5) - 1) / 2
+    lo, hi = math.log(bounds[0]), math.log(bounds[1])
+    a, b = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+    error_a, error_b = fit_error(module, math.exp(a), reference), fit_error(module, math.exp(b), reference)
+    for _ in range(iterations):
+        if error_a < error_b:
+            hi, b, error_b = b, a, error_a
+            a = hi - ratio * (hi - lo)
+            error_a = fit_error(module, math.exp(a), reference)
+        else:
+            lo, a, error_a = a, b, error_b
+            b = lo + ratio * (hi - lo)
+            error_b = fit_error(module, math.exp(b), reference)
+    kernel, error = (math.exp(a), error_a) if error_a < error_b else (math.exp(b), error_b)
+    return kernel, error, reference
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modelo de campo medio (Smoluchowski) de los modelos de gotas")
+    parser.add_argument("script", help="Nombre del script, por ejemplo proyecto2")
+    parser.add_argument("--steps", type=int, default=None, help="Pasos (por defecto MAX_TIME_STEPS)")
+    parser.add_argument("--kernel", type=float, default=DEFAULT_KERNEL, help="Núcleo de coalescencia")
+    parser.add_argument("--calibrate", action="store_true", help="Ajustar el núcleo con corridas de la cuadrícula")
+    parser.add_argument("--calibration-steps", type=int, default=200)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2], help="Semillas de la calibración")
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.script)
+    kernel = args.kernel
+    if args.calibrate:
+        kernel, error, _ = calibrate(args.script, args.calibration_steps, args.seeds)
+        print(f"Núcleo calibrado: {kernel:.4f} (error {error:.4f})")
+
+    steps = module.MAX_TIME_STEPS if args.steps is None else args.steps
+    solver = Solver.from_module(module, kernel)
+    start = time.perf_counter()
+    results = solver.run(steps)
+    elapsed = time.perf_counter() - start
+    print(f"{steps} pasos en {elapsed:.3f} s ({1e6 * elapsed / steps:.1f} µs por paso)")
+    print(f"Tamaño medio final: {results['average_sizes'][-1]:.3f}, "
+          f"gotas: {results['droplet_counts'][-1]:.1f}, masa: {results['total_mass'][-1]:.1f}")
@@ -0,0 +1,42 @@
+import json
+import os
+
+import barrido
+
+STEPS = 30
+PARAM_GRID = {"ADD_DROPLET_PROB": [0.01, 0.05]}
+
+
+# Función para comparar resultados sin el tiempo ni el proceso de cada corrida
+def summaries(results):
+    return sorted(
+        (json.dumps(result["params"], sort_keys=True), result["seed"], json.dumps(result["summary"], sort_keys=True))
+        for result in results
+    )
+
+
+# Repetir un barrido sólo lee la caché, con los mismos resultados
+def test_repeated_sweep_uses_cache(tmp_path):
+    first, first_stats = barrido.run_sweep("proyecto2", PARAM_GRID, [0, 1], STEPS, 1, tmp_path)
+    second, second_stats = barrido.run_sweep("proyecto2", PARAM_GRID, [0, 1], STEPS, 1, tmp_path)
+    assert sum(stats["runs"] for stats in first_stats.values()) == 4
+    assert second_stats == {}
+    assert summaries(first) == summaries(second)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+# Cada punto usa su generador hijo: el resultado no depende de los procesos
+def test_workers_do_not_change_the_result(tmp_path):
+    serial, _ = barrido.run_sweep("proyecto2", PARAM_GRID, [0], STEPS, 1, tmp_path / "serie")
+    parallel, _ = barrido.run_sweep("proyecto2", PARAM_GRID, [0], STEPS, 2, tmp_path / "paralelo")
+    assert summaries(serial) == summaries(parallel)
+
+
+# Un archivo de caché cortado a la mitad cuenta como ausente y se recalcula
+def test_truncated_cache_file_is_recomputed(tmp_path):
+    results, _ = barrido.run_sweep("proyecto2", PARAM_GRID, [0], STEPS, 1, tmp_path)
+    path = tmp_path / (barrido.cache_key("proyecto2", results[0]["params"], 0, STEPS) + ".json")
+    path.write_text(path.read_text()[:20])
+    again, stats = barrido.run_sweep("proyecto2", PARAM_GRID, [0], STEPS, 1, tmp_path)
+    assert sum(worker["runs"] for worker in stats.values()) == 1
+    assert summaries(again) == summaries(results)
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+import aleatorio
+import checkpoint
+import ejecucion
+import proyecto2
+import proyecto3
+import proyecto5
+
+STEPS = 120
+STOP = 70  # Paso en que se corta la primera parte
+
+
+# Cortar una corrida y reanudarla desde el punto de control da exactamente
+# las mismas series que correrla de una vez: la cuadrícula, el recolector y
+# el estado del generador vuelven tal cual
+@pytest.mark.parametrize("module", [proyecto2, proyecto3, proyecto5])
+def test_resume_is_bit_for_bit(module, tmp_path):
+    aleatorio.seed(0)
+    full = ejecucion.run_model(module, STEPS)
+
+    path = str(tmp_path / "corrida.ckpt")
+    aleatorio.seed(0)
+    ejecucion.run_model(module, STOP, checkpoints=checkpoint.Checkpointer(path, every=25))
+    aleatorio.seed(1)  # La reanudación no depende del generador actual
+    resumed = ejecucion.run_model(module, STEPS, checkpoints=checkpoint.Checkpointer(path, every=25, resume=True))
+    assert resumed == full
+
+
+# Un punto de control de otra versión no se carga a medias
+def test_other_version_is_rejected(tmp_path):
+    path = str(tmp_path / "vieja.ckpt")
+    checkpoint.atomic_pickle(path, {"version": checkpoint.CHECKPOINT_VERSION - 1})
+    with pytest.raises(ValueError):
+        checkpoint.load_checkpoint(path)
+    assert not os.path.exists(path + ".tmp")
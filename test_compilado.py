@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import aleatorio
+import compilado
+import ejecucion
+import motor
+import motor_nubes
+import proyecto3
+
+SEEDS = range(8)
+STEPS = 50
+
+
+# Función para comprobar que un script da las mismas estadísticas con NumPy y
+# con Numba: la diferencia de medias de cada métrica debe quedar por debajo de
+# 3 errores estándar
+@pytest.mark.skipif(not compilado.AVAILABLE, reason="numba no está instalado")
+@pytest.mark.parametrize("script, kernel", [
+    ("proyecto1", "move_kernel"),
+    ("proyecto3", "split_kernel"),
+    ("proyecto5", "cloud_kernel"),
+])
+def test_backends_agree(script, kernel):
+    for name, summary in compilado.compare_backends(script, STEPS, SEEDS).items():
+        assert abs(summary["z"]) < 3, f"{kernel}: {name} difiere entre backends (z = {summary['z']:+.2f})"
+
+
+# Sin Numba, "auto" usa NumPy y da exactamente la corrida de "numpy"
+@pytest.mark.skipif(compilado.AVAILABLE, reason="numba está instalado")
+def test_auto_falls_back_to_numpy(monkeypatch):
+    runs = []
+    for backend in ("numpy", "auto"):
+        monkeypatch.setattr(compilado, "BACKEND", backend)
+        assert not compilado.enabled()
+        aleatorio.seed(0)
+        runs.append(ejecucion.run_model(proyecto3, STEPS)["statistics"])
+    assert runs[0] == runs[1]
+
+
+@pytest.mark.skipif(compilado.AVAILABLE, reason="numba está instalado")
+def test_numba_backend_needs_numba():
+    with pytest.raises(ValueError):
+        compilado.resolve("numba")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        compilado.resolve("cuda")
+
+
+# Los núcleos como funciones de Python (el camino sin Numba) conservan la
+# masa: con la caminata aleatoria ninguna gota se queda sin movimiento
+def test_python_move_kernel_conserves_mass(monkeypatch):
+    monkeypatch.setattr(compilado, "move_kernel", compilado.move_kernel.py_func)
+    rng = aleatorio.make_generator(0)
+    grid = motor.random_grid((12, 12), 0.4, rng=rng)
+    moved = compilado.move_droplets(grid, motor.RANDOM_WALK_MOVES, rng=rng)
+    assert moved.sum() == pytest.approx(grid.sum())
+    assert np.count_nonzero(moved) <= np.count_nonzero(grid)
+
+
+def test_python_split_kernel_conserves_mass(monkeypatch):
+    monkeypatch.setattr(compilado, "split_kernel", compilado.split_kernel.py_func)
+    rng = aleatorio.make_generator(0)
+    grid = np.zeros((10, 10))
+    grid[::3, ::3] = 20.0
+    split = compilado.split_droplets(grid.copy(), 10, 1.0, motor.RANDOM_WALK_MOVES, rng=rng)
+    assert split.sum() == pytest.approx(grid.sum())
+    assert np.count_nonzero(split) > np.count_nonzero(grid)
+    assert split.min() >= 0
+
+
+# Con probabilidades 0 el autómata es determinista: el núcleo de Python y los
+# planos de bits de motor_nubes.py deben coincidir celda por celda
+def test_python_cloud_kernel_matches_planes(monkeypatch):
+    monkeypatch.setattr(compilado, "cloud_kernel", compilado.cloud_kernel.py_func)
+    rng = aleatorio.make_generator(0)
+    grid = np.zeros((16, 16), dtype=[("humidity", bool), ("cloud", bool), ("act", bool)])
+    for field in ("humidity", "cloud", "act"):
+        grid[field] = rng.random((16, 16)) < 0.3
+    kernel_grid = compilado.update_cloud_grid(grid, 0.0, 0.0, 0.0, rng=rng)
+    planes = motor_nubes.update_planes(motor_nubes.pack_grid(grid), 0.0, 0.0, 0.0, rng=rng)
+    assert np.array_equal(kernel_grid, motor_nubes.unpack_grid(planes))
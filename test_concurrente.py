@@ -0,0 +1,63 @@
+import os
+
+# Sin pantalla: pygame usa el controlador de video "dummy"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+import pytest
+
+import aleatorio
+import concurrente
+import ejecucion
+import proyecto2
+
+STEPS = 50
+
+
+@pytest.fixture
+def clock():
+    pygame.display.init()
+    yield pygame.time.Clock()
+    pygame.display.quit()
+
+
+# Función para correr proyecto2 con la física en un hilo, sin dibujar
+def run_decoupled(simulation_step, clock):
+    return concurrente.run_decoupled(
+        proyecto2.initialize_grid, simulation_step, ejecucion.make_collector(proyecto2),
+        lambda grid: None, STEPS, clock, 1000,
+    )
+
+
+# Publicar sobre una foto pendiente la reemplaza, y la foto es una copia
+def test_snapshot_buffer_keeps_the_latest_copy():
+    buffer = concurrente.SnapshotBuffer()
+    grid = np.zeros((3, 3))
+    buffer.publish(1, grid)
+    grid[0, 0] = 7
+    buffer.publish(2, grid)
+    grid[0, 0] = 9
+    time_step, snapshot = buffer.take()
+    assert (time_step, snapshot[0, 0]) == (2, 7)
+    assert (buffer.published, buffer.dropped) == (2, 1)
+    assert buffer.take() is None
+
+
+# La física en su hilo da las mismas series que la corrida sin ventana
+def test_threaded_run_matches_headless(clock):
+    aleatorio.seed(0)
+    headless = ejecucion.run_model(proyecto2, STEPS)
+    aleatorio.seed(0)
+    threaded = run_decoupled(ejecucion.step_function(proyecto2), clock)
+    assert threaded["statistics"] == headless["statistics"]
+
+
+# Un error en el hilo de la simulación se relanza en el hilo principal
+def test_simulation_errors_are_raised(clock):
+    def failing_step(grid):
+        raise ValueError("paso roto")
+
+    with pytest.raises(ValueError, match="paso roto"):
+        run_decoupled(failing_step, clock)
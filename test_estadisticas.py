@@ -0,0 +1,66 @@
+import numpy as np
+
+import aleatorio
+import estadisticas
+import motor
+
+STEPS = 5000
+
+
+# Función para pasar una serie de valores por el detector del estado
+# estacionario (cada "cuadrícula" es directamente el valor de la métrica)
+def run_detector(values, tolerance=0.05):
+    detector = estadisticas.SteadyStateDetector(
+        estadisticas.SeriesCollector(lambda value: {"metric": value}), tolerance,
+    )
+    for value in values:
+        detector.update(value)
+        if detector.converged:
+            break
+    return detector
+
+
+# Ruido alrededor de una media fija: estado estacionario con la media correcta
+def test_stationary_series_converges():
+    rng = aleatorio.make_generator(0)
+    detector = run_detector(100 + rng.normal(0, 1, STEPS))
+    assert detector.converged
+    assert abs(detector.estimates["metric"]["mean"] - 100) < 1
+
+
+# Una rampa lenta deriva menos que tolerance veces la media en cada ventana,
+# pero mucho más que su error estándar: no es estado estacionario
+def test_slow_ramp_is_not_steady():
+    rng = aleatorio.make_generator(0)
+    detector = run_detector(100 + 0.002 * np.arange(STEPS) + rng.normal(0, 1, STEPS))
+    assert not detector.converged
+
+
+# El recolector en línea da los mismos momentos, histograma y series que
+# guardar todos los tamaños de todos los pasos (como los scripts originales)
+def test_streaming_stats_match_full_lists():
+    rng = aleatorio.make_generator(0)
+    grids = [motor.random_grid((12, 12), 0.3, rng=rng) for time_step in range(300)]
+    collector = estadisticas.StreamingStats(bin_width=2.0, n_bins=5, series_capacity=64)
+    for grid in grids:
+        collector.update(grid)
+    results = collector.results()
+
+    all_sizes = np.concatenate([motor.droplet_sizes(grid) for grid in grids])
+    average_sizes = np.array([motor.droplet_sizes(grid).mean() for grid in grids])
+    statistics = results["statistics"]
+    assert statistics["steps"] == len(grids)
+    assert statistics["droplet_sizes"]["n"] == len(all_sizes)
+    assert np.isclose(statistics["droplet_sizes"]["mean"], all_sizes.mean())
+    assert np.isclose(statistics["droplet_sizes"]["std"], all_sizes.std(ddof=1))
+    assert np.isclose(statistics["average_sizes"]["mean"], average_sizes.mean())
+    assert np.isclose(statistics["average_sizes"]["std"], average_sizes.std(ddof=1))
+
+    bins = np.minimum((all_sizes / 2.0).astype(np.intp), 4)
+    assert results["size_histogram"] == np.bincount(bins, minlength=5).tolist()
+    assert results["final_droplet_sizes"] == motor.droplet_sizes(grids[-1]).tolist()
+
+    # Las series decimadas son muestras exactas de la serie completa
+    assert len(results["time_steps"]) <= 65
+    assert results["time_steps"][0] == 0 and results["time_steps"][-1] == len(grids) - 1
+    assert np.allclose(results["average_sizes"], average_sizes[results["time_steps"]])
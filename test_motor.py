@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import aleatorio
+import motor
+import proyecto4
+
+SHAPE = (5, 6)
+REPLICAS = 20000  # Cuadrículas con una sola gota, movidas en una sola llamada
+
+
+# Función con la regla de los scripts originales para una gota: la lista de
+# celdas vecinas permitidas para su tamaño y dentro de la cuadrícula, de la
+# que se elige una al azar
+def reference_targets(i, j, size, moves, thresholds=None, class_masks=None):
+    allowed = np.ones(len(moves), dtype=bool)
+    if thresholds is not None:
+        allowed = np.asarray(class_masks)[motor.size_classes(np.array([size]), thresholds)[0]]
+    return [
+        (i + di, j + dj) for (di, dj), ok in zip(moves, allowed)
+        if ok and 0 <= i + di < SHAPE[0] and 0 <= j + dj < SHAPE[1]
+    ]
+
+
+# El movimiento vectorizado de una gota en una esquina, un borde y el
+# interior cae en cada celda de la regla original con la misma frecuencia
+# (a menos de 5 desviaciones estándar); sin destinos, la gota desaparece
+@pytest.mark.parametrize("moves, thresholds, class_masks", [
+    (motor.RANDOM_WALK_MOVES, None, None),
+    (motor.ALL_MOVES, None, None),
+    (motor.FALLING_MOVES, [proyecto4.MEDIUM_THRESHOLD, proyecto4.MEDIUM_LARGE_THRESHOLD], proyecto4.FALLING_MOVE_MASKS),
+])
+@pytest.mark.parametrize("i, j", [(0, 0), (0, 3), (2, 5), (2, 2), (4, 4)])
+@pytest.mark.parametrize("size", [5.0, 20.0])
+def test_move_distribution_matches_reference(moves, thresholds, class_masks, i, j, size):
+    grids = np.zeros((REPLICAS, *SHAPE))
+    grids[:, i, j] = size
+    moved = motor.move_droplets(grids, moves, thresholds, class_masks, rng=aleatorio.make_generator(0))
+
+    targets = reference_targets(i, j, size, moves, thresholds, class_masks)
+    counts = np.count_nonzero(moved, axis=0)
+    assert counts.sum() == (REPLICAS if targets else 0)
+    assert set(zip(*np.nonzero(counts))) <= set(targets)
+    for target in targets:
+        expected = REPLICAS / len(targets)
+        assert abs(counts[target] - expected) < 5 * np.sqrt(expected)
+    assert moved.sum() == pytest.approx(REPLICAS * size if targets else 0)
+
+
+# Las gotas que llegan a la misma celda se suman (coalescencia) y las
+# cuadrículas de un conjunto no se mezclan
+def test_move_coalesces_and_keeps_replicas_apart():
+    rng = aleatorio.make_generator(0)
+    grids = np.stack([motor.random_grid(SHAPE, 0.6, rng=rng) for replica in range(50)])
+    moved = motor.move_droplets(grids, rng=rng)
+    assert moved.sum(axis=(1, 2)) == pytest.approx(grids.sum(axis=(1, 2)))
+    assert (np.count_nonzero(moved, axis=(1, 2)) <= np.count_nonzero(grids, axis=(1, 2))).all()
+
+
+# Los dos trozos de una división suman exactamente el tamaño original y
+# cada uno es de al menos 1
+def test_split_sizes_conserve_mass_exactly():
+    rng = aleatorio.make_generator(0)
+    sizes = rng.uniform(2, 1000, 100000)
+    kept, fragments = motor.split_sizes(sizes, rng)
+    assert np.array_equal(kept + fragments, sizes)
+    assert (kept >= 1).all() and (fragments >= 1).all()
+
+
+# Cada división va a un vecino vacío de la cuadrícula de antes de dividir, a
+# lo sumo una por celda de destino, y la regla conserva la masa
+@pytest.mark.parametrize("collisions", motor.SPLIT_COLLISIONS)
+def test_plan_splits_targets_distinct_empty_neighbours(collisions):
+    rng = aleatorio.make_generator(0)
+    grid = motor.random_grid((30, 30), 0.5, mean=12, std=4, rng=rng)
+    flat = grid.reshape(-1)
+    cells = np.flatnonzero(flat > 10)
+    sources, targets, kept, fragments = motor.plan_splits(
+        cells, flat[cells], grid.shape, lambda targets: flat[targets] == 0, 1.0,
+        collisions=collisions, rng=rng,
+    )
+    assert len(sources) > 0
+    assert len(np.unique(targets)) == len(targets)
+    assert (flat[targets] == 0).all()
+    distance = np.abs(np.subtract(np.divmod(sources, 30), np.divmod(targets, 30))).sum(axis=0)
+    assert (distance == 1).all()
+    assert np.array_equal(kept + fragments, flat[sources])
+
+    split = motor.Splitting(10, 1.0, collisions=collisions).apply(grid.copy(), rng)
+    assert split.sum() == pytest.approx(grid.sum())
+    assert np.count_nonzero(split) > np.count_nonzero(grid)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import motor
+import paralelo
+import proyecto2
+import proyecto3
+
+SHAPE = (48, 40)
+STEPS = 10
+
+
+# Función para correr unos pasos con las franjas y devolver la cuadrícula
+def run_strips(rules, workers, n_strips=4):
+    with paralelo.DropletStrips(SHAPE, n_strips, workers, seed=0) as pool:
+        pool.initialize(0.3)
+        for time_step in range(STEPS):
+            pool.step(rules())
+        return pool.grid.copy()
+
+
+# El resultado depende de la semilla y del número de franjas, no del número
+# de procesos que las corren
+@pytest.mark.parametrize("module", [proyecto2, proyecto3])
+def test_workers_do_not_change_the_result(module):
+    assert np.array_equal(run_strips(module.rules, 1), run_strips(module.rules, 2))
+
+
+# Sólo división, con gotas grandes en filas de borde: ningún trozo se pierde
+# ni se duplica al cruzar a la franja vecina
+def test_splitting_across_strips_conserves_mass():
+    rules = [motor.Splitting(proyecto3.SPLIT_THRESHOLD, 1.0)]
+    with paralelo.DropletStrips(SHAPE, 6, 1, seed=0) as pool:
+        pool.grid[::3, ::3] = 40.0
+        mass = pool.grid.sum()
+        crossings = 0
+        for time_step in range(STEPS):
+            pool.step(rules)
+            crossings += np.count_nonzero(paralelo.shared_array(pool.splits)[:, :, 0])
+            assert pool.grid.sum() == pytest.approx(mass)
+        assert crossings > 0
+        assert pool.grid.min() >= 0
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import aleatorio
+import motor
+import particulas
+import proyecto1
+import proyecto2
+import proyecto3
+import proyecto4
+import proyecto4_v2
+import proyecto4Alex
+
+SHAPE = (40, 30)
+STEPS = 40
+
+
+# Función para avanzar una cuadrícula densa o de partículas con las reglas de
+# un modelo, sin cambiar de representación
+def run_rules(state, rules, rng):
+    for time_step in range(STEPS):
+        for rule in rules:
+            state = rule.apply(state, rng)
+    return particulas.as_grid(state)
+
+
+# Con la misma semilla las partículas sortean lo mismo que la cuadrícula
+# densa: las dos representaciones terminan en la misma cuadrícula
+@pytest.mark.parametrize("module", [proyecto1, proyecto2, proyecto3, proyecto4, proyecto4_v2, proyecto4Alex])
+def test_sparse_matches_dense(module):
+    grid = motor.random_grid(SHAPE, 0.1, rng=aleatorio.make_generator(1))
+    dense = run_rules(grid.copy(), module.rules(), aleatorio.make_generator(0))
+    sparse = run_rules(particulas.Particles.from_grid(grid), module.rules(), aleatorio.make_generator(0))
+    assert np.array_equal(sparse, dense)
+
+
+# Ida y vuelta entre las dos representaciones sin pérdidas
+def test_round_trip():
+    grid = motor.random_grid(SHAPE, 0.1, rng=aleatorio.make_generator(0))
+    particles = particulas.Particles.from_grid(grid)
+    assert len(particles) == np.count_nonzero(grid)
+    assert np.array_equal(particles.to_grid(), grid)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import aleatorio
+import ejecucion
+import particulas
+import proyecto3
+import proyecto5
+import trayectorias
+
+STEPS = 150  # Más de dos bloques de CHUNK_FRAMES
+
+
+# Recolector que guarda una copia de cada cuadrícula, para comparar con lo grabado
+class GridCollector:
+    def __init__(self):
+        self.grids = []
+
+    def start(self, time_step, grid):
+        self.grids.append(particulas.as_grid(grid).copy())
+
+    def update(self, grid):
+        self.grids.append(particulas.as_grid(grid).copy())
+
+    def results(self):
+        return self.grids
+
+
+# Grabar una corrida y leerla da la cuadrícula inicial y la de cada paso, con
+# su número de paso, en gotas (float32) y en nubes (planos de bits)
+@pytest.mark.parametrize("module", [proyecto3, proyecto5])
+def test_record_then_replay_round_trip(module, tmp_path):
+    path = str(tmp_path / "trayectoria.bin")
+    aleatorio.seed(0)
+    grids = ejecucion.run_headless(
+        module.initialize_grid, ejecucion.step_function(module),
+        trayectorias.record_to(GridCollector(), path), STEPS,
+    )
+
+    reader = trayectorias.TrajectoryReader(path)
+    assert len(reader) == STEPS + 1
+    assert reader.time_steps.tolist() == list(range(STEPS + 1))
+    for time_step, grid in enumerate(grids):
+        if module is proyecto5:
+            assert np.array_equal(reader[time_step], grid)
+        else:
+            assert np.array_equal(reader[time_step], grid.astype(np.float32))
+
+
+# Una grabación cortada antes de close() se puede leer hasta el último bloque
+# escrito
+def test_interrupted_recording_is_readable(tmp_path):
+    path = str(tmp_path / "cortada.bin")
+    recorder = trayectorias.TrajectoryRecorder(path, chunk_frames=4)
+    grids = [np.full((3, 3), time_step, dtype=float) for time_step in range(10)]
+    for time_step, grid in enumerate(grids):
+        recorder.record(time_step, grid)
+    recorder.put(None)
+    recorder.writer.join()
+    recorder.file.close()
+
+    reader = trayectorias.TrajectoryReader(path)
+    assert len(reader) == 8
+    assert np.array_equal(reader[7], grids[7])
@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+import estadisticas
+import motor_nubes
+import particulas
+import perfilado
+
+# Grabación de trayectorias completas en disco y reproducción sin volver a
+# simular. El archivo tiene una cabecera JSON de tamaño fijo, los cuadros uno
+# detrás de otro (float32 para los modelos de gotas, planos de bits
+# empaquetados para proyecto5) y al final un índice con el paso de cada cuadro.
+# Los cuadros se agrupan en bloques de CHUNK_FRAMES y un hilo escritor los
+# baja a disco, así que el bucle de simulación sólo copia la cuadrícula.
+
+MAGIC = b"NUBETRAY"  # Identificador al inicio del archivo
+HEADER_SIZE = 4096  # Bytes reservados para la cabecera; los cuadros empiezan aquí
+CHUNK_FRAMES = 64  # Cuadros por bloque escrito
+QUEUE_CHUNKS = 8  # Bloques que pueden esperar al escritor antes de frenar la simulación
+PUT_TIMEOUT = 0.1  # Segundos entre revisiones del escritor mientras la cola está llena
+
+
+# Función para saber si una cuadrícula es la del autómata de nubes (proyecto5)
+def is_cloud_grid(grid):
+    return grid.dtype.names is not None and "humidity" in grid.dtype.names
+
+
+# Función para codificar una cuadrícula como cuadro del archivo
+def encode_frame(grid):
+    if is_cloud_grid(grid):
+        planes = motor_nubes.pack_grid(grid)
+        return np.stack([planes.humidity, planes.cloud, planes.act])
+    return grid.astype(np.float32)
+
+
+# Función para armar la cabecera a partir del primer cuadro
+def frame_header(grid, frame):
+    return {
+        "version": 1,
+        "kind": "planes" if is_cloud_grid(grid) else "droplets",
+        "dtype": frame.dtype.str,
+        "frame_shape": list(frame.shape),
+        "grid_shape": list(grid.shape),
+        "frames": None,  # Se completa al cerrar; None indica una grabación interrumpida
+        "index_offset": None,
+    }
+
+
+# Función para serializar la cabecera dentro de HEADER_SIZE bytes
+def header_bytes(header):
+    data = json.dumps(header).encode()
+    if len(data) + 12 > HEADER_SIZE:
+        raise ValueError("La cabecera de la trayectoria no cabe en HEADER_SIZE")
+    block = MAGIC + len(data).to_bytes(4, "little") + data
+    return block + bytes(HEADER_SIZE - len(block))
+
+
+# Grabador de trayectorias. record(time_step, grid) copia la cuadrícula en el
+# bloque actual; los bloques llenos pasan por una cola a un hilo que es el
+# único que toca el archivo. close() escribe el último bloque, el índice y la
+# cabecera definitiva. Si el escritor falla (por ejemplo, disco lleno) guarda
+# el error y el siguiente record() o close() lo relanza en vez de quedarse
+# esperando lugar en la cola.
+class TrajectoryRecorder:
+    def __init__(self, path, chunk_frames=CHUNK_FRAMES):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.file = open(path, "wb")
+        self.queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+        self.header = None
+        self.chunk = None
+        self.filled = 0
+        self.frames = 0
+        self.frame_bytes = 0
+        self.time_steps = []
+        self.error = None
+        self.writer = threading.Thread(target=self.write_chunks, name="trayectoria", daemon=True)
+        self.writer.start()
+
+    # Bucle del hilo escritor: cada elemento es (posición, datos)
+    def write_chunks(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                offset, data = item
+                self.file.seek(offset)
+                self.file.write(data)
+        except BaseException as error:
+            self.error = error
+
+    # Relanza en el hilo de la simulación el error del escritor, si lo hubo
+    def check_writer(self):
+        if self.error is not None:
+            raise self.error
+        if not self.writer.is_alive():
+            raise ValueError(f"El escritor de {self.path} terminó antes de cerrar la grabación")
+
+    # Encola un elemento para el escritor sin bloquearse si el escritor murió
+    def put(self, item):
+        while True:
+            self.check_writer()
+            try:
+                self.queue.put(item, timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+
+    def record(self, time_step, grid):
+        grid = particulas.as_grid(grid)
+        frame = encode_frame(grid)
+        if self.header is None:
+            self.header = frame_header(grid, frame)
+            self.frame_bytes = frame.nbytes
+            self.put((0, header_bytes(self.header)))
+        if self.chunk is None:
+            self.chunk = np.empty((self.chunk_frames, *frame.shape), dtype=frame.dtype)
+        self.chunk[self.filled] = frame
+        self.filled += 1
+        self.time_steps.append(time_step)
+        if self.filled == self.chunk_frames:
+            self.flush()
+
+    # Manda el bloque actual al escritor; el bloque no se reutiliza porque el
+    # hilo escritor todavía lo puede estar leyendo
+    def flush(self):
+        if self.filled == 0:
+            return
+        offset = HEADER_SIZE + self.frames * self.frame_bytes
+        self.put((offset, memoryview(self.chunk[:self.filled]).cast("B")))
+        self.frames += self.filled
+        self.chunk = None
+        self.filled = 0
+
+    def close(self):
+        try:
+            self.flush()
+            if self.header is not None:
+                index_offset = HEADER_SIZE + self.frames * self.frame_bytes
+                self.put((index_offset, np.asarray(self.time_steps, dtype=np.int64).tobytes()))
+                self.header.update(frames=self.frames, index_offset=index_offset)
+                self.put((0, header_bytes(self.header)))
+            self.put(None)
+            self.writer.join()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.file.close()
+
+
+# Recolector que graba cada paso en disco antes de pasarlo a otro recolector
+# (ver estadisticas.py); al pedir los resultados cierra la grabación. Los
+# bucles de ejecución le pasan la cuadrícula inicial con start(), así que la
+# reproducción empieza en el paso 0.
+class RecordingCollector:
+    def __init__(self, collector, path):
+        self.collector = collector
+        self.recorder = TrajectoryRecorder(path)
+        self.time_step = 1
+
+    def start(self, time_step, grid):
+        self.recorder.record(time_step, grid)
+        self.time_step = time_step + 1
+        estadisticas.start(self.collector, time_step, grid)
+
+    def update(self, grid):
+        self.recorder.record(self.time_step, grid)
+        self.collector.update(grid)
+        self.time_step += 1
+
+    @property
+    def converged(self):
+        return getattr(self.collector, "converged", False)
+
+    def results(self):
+        self.recorder.close()
+        return self.collector.results()
+
+
+# Función para envolver un recolector con la grabación si se pidió un archivo
+def record_to(collector, path=None):
+    if path is None:
+        return collector
+    return RecordingCollector(collector, path)
+
+
+# Lector de trayectorias: mapea los cuadros del archivo con np.memmap, así que
+# acceder a cualquier paso no lee el resto del archivo. Los cuadros de gotas se
+# devuelven como vistas float32 sin copiar; los de proyecto5 se desempaquetan
+# a la cuadrícula estructurada.
+class TrajectoryReader:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            block = f.read(HEADER_SIZE)
+        if block[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es una trayectoria grabada o está vacía")
+        length = int.from_bytes(block[8:12], "little")
+        self.header = json.loads(block[12:12 + length])
+        self.kind = self.header["kind"]
+        self.grid_shape = tuple(self.header["grid_shape"])
+        frame_shape = tuple(self.header["frame_shape"])
+        dtype = np.dtype(self.header["dtype"])
+        frame_bytes = int(np.prod(frame_shape)) * dtype.itemsize
+
+        frames = self.header["frames"]
+        if frames is None:
+            # Grabación interrumpida: se usan los cuadros completos que haya
+            frames = (os.path.getsize(path) - HEADER_SIZE) // frame_bytes
+            self.time_steps = np.arange(frames)
+        else:
+            self.time_steps = np.fromfile(path, dtype=np.int64, count=frames, offset=self.header["index_offset"])
+        if frames:
+            self.frames = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(frames, *frame_shape))
+        else:
+            self.frames = np.zeros((0, *frame_shape), dtype=dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        frame = self.frames[index]
+        if self.kind == "planes":
+            return motor_nubes.unpack_grid(motor_nubes.CloudPlanes(*frame, self.grid_shape[-1]))
+        return frame
+
+
+# Función para reproducir una trayectoria con el draw_frame de un script.
+# Espacio pausa o reanuda, las flechas avanzan o retroceden un paso y Inicio
+# vuelve al principio; al llegar al final se queda en el último cuadro hasta
+# cerrar la ventana.
+def replay(path, draw_frame, clock, fps):
+    import pygame
+
+    reader = TrajectoryReader(path)
+    if len(reader) == 0:
+        print(f"{path} no tiene cuadros")
+        return
+    index = 0
+    playing = True
+    while True:
+        for event in pygame.event.get():
+            perfilado.profiler.handle_event(event)
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                elif event.key == pygame.K_RIGHT:
+                    index, playing = min(index + 1, len(reader) - 1), False
+                elif event.key == pygame.K_LEFT:
+                    index, playing = max(index - 1, 0), False
+                elif event.key == pygame.K_HOME:
+                    index = 0
+
+        draw_frame(reader[index])
+        pygame.display.set_caption(f"Reproducción de {os.path.basename(path)}: paso {reader.time_steps[index]}")
+        if playing and index < len(reader) - 1:
+            index += 1
+        clock.tick(fps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Información de una trayectoria grabada")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    reader = TrajectoryReader(args.path)
+    print(f"{args.path}: {len(reader)} cuadros de {reader.kind} {reader.grid_shape}")
+    if len(reader):
+        print(f"Pasos {reader.time_steps[0]} a {reader.time_steps[-1]}")